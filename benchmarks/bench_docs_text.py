@@ -0,0 +1,139 @@
+"""
+Docs 本文抽出の比較ベンチマーク
+
+    python benchmarks/bench_docs_text.py [段落数]
+
+- legacy:   fields 指定なしの documents.get 全体を json.loads し、段落の textRun だけを連結（従来の get_doc_text_content）
+- masked:   fields マスク付きのレスポンスを json.loads して extract_text（ストリーミング失敗時のフォールバック）
+- streamed: fields マスク付きのレスポンスを 64KiB チャンクで iter_text_runs（通常の経路）
+
+response はレスポンス本体の大きさ。peak は解析中の最大メモリ（tracemalloc、レスポンス本体の保持分を含む）
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.docs_text import STREAM_CHUNK_SIZE, extract_text, iter_text_runs  # noqa: E402
+
+WORDS = ["会議", "議題", "決定事項", "次回", "確認", "対応", "共有", "予算", "スケジュール", "the", "plan", "review"]
+
+
+def _text_style(rnd):
+    return {
+        "bold": rnd.random() < 0.1,
+        "weightedFontFamily": {"fontFamily": "Arial", "weight": 400},
+        "fontSize": {"magnitude": 11, "unit": "PT"},
+        "foregroundColor": {"color": {"rgbColor": {"red": 0.2, "green": 0.2, "blue": 0.2}}},
+    }
+
+
+def _paragraph(rnd, i, full):
+    text = f"{i:05d} 話者{rnd.randint(1, 6)}: " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 40))) + "\n"
+    if not full:
+        return {"paragraph": {"elements": [{"textRun": {"content": text}}]}}
+    return {
+        "startIndex": i * 100,
+        "endIndex": i * 100 + len(text),
+        "paragraph": {
+            "elements": [{
+                "startIndex": i * 100,
+                "endIndex": i * 100 + len(text),
+                "textRun": {"content": text, "textStyle": _text_style(rnd)},
+            }],
+            "paragraphStyle": {
+                "namedStyleType": "NORMAL_TEXT",
+                "direction": "LEFT_TO_RIGHT",
+                "lineSpacing": 115,
+                "spaceAbove": {"magnitude": 0, "unit": "PT"},
+                "spaceBelow": {"magnitude": 0, "unit": "PT"},
+            },
+        },
+    }
+
+
+def make_document(n: int, full: bool):
+    """n 段落 + 表（20段落ごとに 3x2）の documents.get 相当のレスポンス"""
+    rnd = random.Random(0)
+    content = []
+    for i in range(n):
+        content.append(_paragraph(rnd, i, full))
+        if i % 20 == 19:
+            rows = [{"tableCells": [{"content": [_paragraph(rnd, i, full)]} for _ in range(2)]} for _ in range(3)]
+            content.append({"table": {"rows": 3, "columns": 2, "tableRows": rows} if full else {"tableRows": rows}})
+    doc = {"body": {"content": content}, "headers": {"kix.h1": {"headerId": "kix.h1", "content": [_paragraph(rnd, 0, full)]}}}
+    if full:
+        doc.update({
+            "documentId": "bench",
+            "title": "bench",
+            "documentStyle": {"pageSize": {"height": {"magnitude": 841.89, "unit": "PT"}}},
+            "namedStyles": {"styles": [{"namedStyleType": "NORMAL_TEXT", "textStyle": _text_style(rnd)}] * 9},
+            "lists": {f"kix.list{k}": {"listProperties": {"nestingLevels": [{"glyphType": "DECIMAL"}] * 9}} for k in range(50)},
+        })
+    return json.dumps(doc, ensure_ascii=False).encode("utf-8")
+
+
+def legacy_extract(raw: bytes) -> str:
+    """従来の get_doc_text_content 相当（本文直下の段落のみ）"""
+    document = json.loads(raw)
+    text_parts = []
+    for element in document.get("body", {}).get("content", []):
+        if "paragraph" in element:
+            for elem in element["paragraph"].get("elements", []):
+                if "textRun" in elem:
+                    text_parts.append(elem["textRun"].get("content", ""))
+    return "".join(text_parts).strip()
+
+
+def masked_extract(raw: bytes) -> str:
+    return extract_text(json.loads(raw))
+
+
+def streamed_extract(raw: bytes) -> str:
+    chunks = (raw[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(raw), STREAM_CHUNK_SIZE))
+    return "".join(iter_text_runs(chunks)).strip()
+
+
+def measure(fn, raw: bytes, hold_response: bool):
+    """解析中の最大メモリと時間。hold_response なら本体全体を保持する分も加算"""
+    tracemalloc.start()
+    text = fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 時間は tracemalloc を止めて別に計測（3回の最小値）
+    elapsed = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        fn(raw)
+        elapsed = min(elapsed, time.perf_counter() - t0)
+    if hold_response:
+        peak += len(raw)
+    else:
+        peak += min(len(raw), STREAM_CHUNK_SIZE)
+    return text, peak, elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    full = make_document(n, full=True)
+    masked = make_document(n, full=False)
+    print(f"paragraphs={n}")
+
+    for label, fn, raw, hold in [
+        ("legacy", legacy_extract, full, True),
+        ("masked", masked_extract, masked, True),
+        ("streamed", streamed_extract, masked, False),
+    ]:
+        text, peak, elapsed = measure(fn, raw, hold)
+        print(
+            f"{label:>8}: response={len(raw) / 1024 / 1024:6.1f} MiB  peak={peak / 1024 / 1024:7.1f} MiB"
+            f"  time={elapsed * 1000:7.1f} ms  text={len(text):,} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
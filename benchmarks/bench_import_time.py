@@ -0,0 +1,77 @@
+"""
+エントリポイントごとの起動時間ベンチマーク（python -X importtime）
+
+    python benchmarks/bench_import_time.py [繰り返し回数]
+
+- import:  エントリポイントのモジュール自身の累積 import 時間（-X importtime の値、中央値）
+- wall:    python -c "import src.<module>" の実行時間（インタプリタ起動込み、中央値）
+- heaviest: そのモジュールが直接 import した中で累積時間が長いもの
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+ENTRY_POINTS = [
+    "src.check_and_post_minutes",
+    "src.send_hearing_reminder",
+    "src.send_agenda_reminder",
+    "src.collect_hearing_responses",
+    "src.collect_review_requests",
+    "src.post_final_minutes",
+    "src.drive_monitor",
+    "src.archive_minutes",
+]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_once(module: str):
+    """(累積 import 時間 [us], 実行時間 [s], 直接の子モジュールの [(累積us, 名前)])"""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - t0
+    total = 0
+    children = []
+    pending = []  # importtime は子を親より先に出力する
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)) // 2, m.group(4)
+        if depth == 0:
+            if name == module:
+                total = cumulative
+                children = [(c, n) for d, c, n in pending if d == 1]
+            pending = []
+        else:
+            pending.append((depth, cumulative, name))
+    return total, wall, children
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"python={sys.version.split()[0]} repeat={repeat}")
+    for module in ENTRY_POINTS:
+        totals, walls = [], []
+        children = []
+        for _ in range(repeat):
+            total, wall, children = run_once(module)
+            totals.append(total)
+            walls.append(wall)
+        heaviest = ", ".join(f"{n} {c / 1000:.0f}ms" for c, n in sorted(children, reverse=True)[:3])
+        print(
+            f"{module:<32} import={statistics.median(totals) / 1000:7.1f} ms"
+            f"  wall={statistics.median(walls) * 1000:7.1f} ms  heaviest: {heaviest}"
+        )
+
+
+if __name__ == "__main__":
+    main()
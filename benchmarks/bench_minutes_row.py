@@ -0,0 +1,125 @@
+"""
+MinutesRow と従来の行辞書の比較ベンチマーク
+
+    python benchmarks/bench_minutes_row.py [行数]
+
+- memory: 行オブジェクトの保持に必要なメモリ（tracemalloc）
+- build:  values.get の結果から行リストを作る時間
+- access: 各ステージ相当のフィールド参照（strip / 日付解析込み）の時間
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.minutes_row import EXPECTED_COLUMNS, MinutesRow, schema_for  # noqa: E402
+
+
+def make_values(n: int):
+    """シートの values.get 相当のデータを作る（ヘッダー + n行）"""
+    rnd = random.Random(0)
+    rows = [list(EXPECTED_COLUMNS)]
+    for i in range(n):
+        row = []
+        for col in EXPECTED_COLUMNS:
+            if col in ("date", "next_meeting_date"):
+                row.append(f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}")
+            elif col.endswith("_ts"):
+                row.append(f"{1700000000 + i}.{rnd.randint(0, 999999):06d}" if rnd.random() < 0.7 else "")
+            elif col in ("summary", "formatted_minutes", "final_minutes"):
+                row.append("")  # 大きな本文は射影読み込みで除外される想定
+            else:
+                row.append(f"{col}-{i % 97}" if rnd.random() < 0.5 else "")
+        rows.append(row)
+    return rows
+
+
+def build_dicts(values):
+    headers = values[0]
+    rows = []
+    for i, row in enumerate(values[1:], start=2):
+        d = {headers[j]: (row[j] if j < len(row) else "") for j in range(len(headers))}
+        d["_row_number"] = i
+        rows.append(d)
+    return rows
+
+
+def build_minutes_rows(values):
+    schema = schema_for(values[0])
+    return [MinutesRow(schema, row, i) for i, row in enumerate(values[1:], start=2)]
+
+
+def access_dicts(rows):
+    hits = 0
+    for row in rows:
+        if row.get("minutes_thread_ts", "").strip() and row.get("channel_id", "").strip():
+            hits += 1
+        title = row.get("title", "").strip()
+        date_raw = row.get("date", "").strip()
+        if date_raw:
+            d = datetime.strptime(date_raw[:10], "%Y-%m-%d").date()
+            nd = datetime.strptime(row.get("next_meeting_date", "").strip()[:10], "%Y-%m-%d").date()
+            hits += (d < nd) + (d > nd) + len(title) * 0
+    return hits
+
+
+def access_minutes_rows(rows):
+    hits = 0
+    for row in rows:
+        if row.get("minutes_thread_ts", "") and row.get("channel_id", ""):
+            hits += 1
+        title = row.get("title", "")
+        if row.date_day:
+            d, nd = row.date_day, row.next_meeting_day
+            hits += (d < nd) + (d > nd) + len(title) * 0
+    return hits
+
+
+def measure_memory(build, values):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    rows = build(values)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return rows, size
+
+
+def timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    values = make_values(n)
+    print(f"rows={n} columns={len(EXPECTED_COLUMNS)}")
+
+    for label, build, access in [
+        ("dict", build_dicts, access_dicts),
+        ("MinutesRow", build_minutes_rows, access_minutes_rows),
+    ]:
+        rows, mem = measure_memory(build, values)
+        _, t_build = timed(build, values)
+        # MinutesRow の日付は初回のみ解析されるため、2回目以降の参照も計測
+        _, t_first = timed(access, rows, repeat=1)
+        _, t_access = timed(access, rows)
+        print(
+            f"{label:>10}: memory={mem / n:7.1f} B/row ({mem / 1024 / 1024:6.1f} MiB)"
+            f"  build={t_build * 1000:7.1f} ms  access(first)={t_first * 1000:7.1f} ms"
+            f"  access(repeat)={t_access * 1000:7.1f} ms"
+        )
+        del rows
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET") or input("GOOGLE_CLIENT_SECRET
 
 SCOPES = [
     "https://www.googleapis.com/auth/drive",
+    # BLOB_DRIVE_FOLDER_ID=appDataFolder で本文を退避する場合に必要
+    "https://www.googleapis.com/auth/drive.appdata",
     "https://www.googleapis.com/auth/documents",
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/calendar.readonly",
@@ -0,0 +1,56 @@
+"""
+完了した会議行のアーカイブ
+最終版議事録の投稿が済み、next_meeting_date から一定日数（ARCHIVE_AFTER_DAYS）が過ぎた行を
+事業部ごとのアーカイブシート（archives_<シート名>）へ移動し、各ステージが読む行数を抑える
+"""
+import json
+import os
+import sys
+from .minutes_repo import archive_completed_rows, now_jst
+
+# --daily 指定時に、その日（JST）のアーカイブが済んだかを記録する場所
+ARCHIVE_STATE_PATH = os.getenv("ARCHIVE_STATE_PATH", ".cache/archive_state.json").strip()
+
+
+def load_archive_state() -> dict:
+    """前回のアーカイブの記録を読む。無ければ空"""
+    try:
+        with open(ARCHIVE_STATE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_archive_state(state: dict) -> None:
+    directory = os.path.dirname(ARCHIVE_STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{ARCHIVE_STATE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, ARCHIVE_STATE_PATH)
+
+
+def main():
+    """
+    メイン処理
+    --dry-run: 対象行数の確認のみ
+    --daily: その日（JST）の最初の実行でだけアーカイブする（毎時のジョブから呼ぶ用）
+    """
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    today = now_jst().strftime("%Y-%m-%d")
+    if "--daily" in args and not dry_run:
+        state = load_archive_state()
+        if state.get("last_date") == today:
+            print(f"[archive_minutes] Already archived today ({today}); skipping")
+            return
+        moved = archive_completed_rows()
+        save_archive_state({"last_date": today, "moved": moved})
+        return
+    archive_completed_rows(dry_run=dry_run)
+
+
+if __name__ == "__main__":
+    main()
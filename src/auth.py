@@ -1,8 +1,16 @@
+import hashlib
+import json
 import os
 import time
-from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+
+try:
+    import fcntl
+except ImportError:  # Windows ではファイルロックなしで動かす
+    fcntl = None
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "").strip()
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "").strip()
@@ -14,12 +22,99 @@ DEFAULT_SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/calendar.readonly",
 ]
+# アクセストークンをプロセス間で共有するファイル（空にすると毎回リフレッシュ）
+GOOGLE_TOKEN_CACHE_PATH = os.getenv("GOOGLE_TOKEN_CACHE_PATH", ".cache/google_token.json").strip()
+# 有効期限までこの秒数を切ったトークンは使わずにリフレッシュする
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300") or "300")
+
+
+def _cache_key(scopes) -> str:
+    """クライアント・リフレッシュトークン・スコープが同じ場合だけキャッシュを共有する"""
+    raw = "\n".join([GOOGLE_CLIENT_ID, GOOGLE_REFRESH_TOKEN, *sorted(scopes or [])])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def _token_cache_lock():
+    """キャッシュファイルの排他ロック（同時に起動したプロセスのリフレッシュを1回にまとめる）"""
+    if not GOOGLE_TOKEN_CACHE_PATH or fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(GOOGLE_TOKEN_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(f"{GOOGLE_TOKEN_CACHE_PATH}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _read_cached_token(key: str) -> Optional[Dict]:
+    """有効期限まで余裕のあるキャッシュ済みトークン（無ければ None）"""
+    if not GOOGLE_TOKEN_CACHE_PATH:
+        return None
+    try:
+        with open(GOOGLE_TOKEN_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("key") != key or not data.get("token"):
+        return None
+    if float(data.get("expiry", 0)) - time.time() <= TOKEN_REFRESH_MARGIN_SECONDS:
+        return None
+    return data
+
+
+def _write_cached_token(key: str, token: str, expiry: Optional[datetime]) -> None:
+    if not GOOGLE_TOKEN_CACHE_PATH or not token or expiry is None:
+        return
+    directory = os.path.dirname(GOOGLE_TOKEN_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{GOOGLE_TOKEN_CACHE_PATH}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "token": token, "expiry": expiry.replace(tzinfo=timezone.utc).timestamp()}, f)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, GOOGLE_TOKEN_CACHE_PATH)
+
+
+def _expiry_from_timestamp(ts: float) -> datetime:
+    # google-auth は naive UTC の datetime を期待する
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+class CachedCredentials(Credentials):
+    """
+    リフレッシュ時にまずキャッシュファイルを確認し、他のプロセスが取得済みの
+    有効なトークンがあればそれを使う。無ければリフレッシュしてキャッシュに書く
+    （401 で呼ばれた場合は、今のトークンと同じものは使わずにリフレッシュする）
+    """
+
+    def refresh(self, request) -> None:
+        key = _cache_key(self.scopes)
+        with _token_cache_lock():
+            cached = _read_cached_token(key)
+            if cached and cached["token"] != self.token:
+                self.token = cached["token"]
+                self.expiry = _expiry_from_timestamp(float(cached["expiry"]))
+                print(f"[auth] Using Google access token from cache. Expires in ~{int(float(cached['expiry']) - time.time())}s")
+                return
+            super().refresh(request)
+            _write_cached_token(key, self.token, self.expiry)
+        # Log expiry
+        expires_in = int(self.expiry.replace(tzinfo=timezone.utc).timestamp() - time.time()) if self.expiry else -1
+        print(f"[auth] Google access token refreshed. Expires in ~{expires_in}s")
+
 
 def get_google_credentials(scopes: Optional[list] = None) -> Credentials:
     scopes = scopes or DEFAULT_SCOPES
     if not (GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET and GOOGLE_REFRESH_TOKEN):
         raise RuntimeError("Missing Google OAuth secrets: GOOGLE_CLIENT_ID/SECRET/REFRESH_TOKEN")
-    creds = Credentials(
+    creds = CachedCredentials(
         token=None,
         refresh_token=GOOGLE_REFRESH_TOKEN,
         client_id=GOOGLE_CLIENT_ID,
@@ -27,10 +122,11 @@ def get_google_credentials(scopes: Optional[list] = None) -> Credentials:
         token_uri="https://oauth2.googleapis.com/token",
         scopes=scopes,
     )
-    # Force refresh to obtain access token
-    request = Request()
-    creds.refresh(request)
-    # Log expiry
-    expires_in = int(creds.expiry.timestamp() - time.time()) if creds.expiry else -1
-    print(f"[auth] Google access token refreshed. Expires in ~{expires_in}s")
+    # 有効なトークンがキャッシュにあればそのまま使う。無ければ最初のAPI呼び出し時に
+    # google-auth が refresh() を呼ぶ（取得したトークンはキャッシュに保存される）
+    cached = _read_cached_token(_cache_key(scopes))
+    if cached:
+        creds.token = cached["token"]
+        creds.expiry = _expiry_from_timestamp(float(cached["expiry"]))
+        print(f"[auth] Using Google access token from cache. Expires in ~{int(float(cached['expiry']) - time.time())}s")
     return creds
@@ -0,0 +1,167 @@
+"""
+大きな本文列（formatted_minutes / final_minutes）の退避先
+本文を SHA-256 で名前付けして保存し、シートには短いポインタ（blob:sha256:<hex>）だけを書く
+- BLOB_STORE_DIR: ローカルディレクトリに保存（テスト・ローカル実行向け）
+  GitHub Actions のランナーは実行ごとに消えるため、このディレクトリを actions/cache などで引き継がないと本文が失われる
+- BLOB_DRIVE_FOLDER_ID: Drive に保存（"appDataFolder" を指定するとアプリ専用領域。drive.appdata スコープが必要）
+どちらも未設定なら退避しない
+退避するのは、このリポジトリの投稿処理がポインタを解決する列だけ。
+summary は外部の整形処理（GPT）がシートから直接読むため退避しない
+"""
+import hashlib
+import os
+from typing import Dict, Optional
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "").strip()
+BLOB_DRIVE_FOLDER_ID = os.getenv("BLOB_DRIVE_FOLDER_ID", "").strip()
+# これを超える文字数の本文を退避する（セル上限は50,000文字）
+BLOB_OFFLOAD_THRESHOLD = int(os.getenv("BLOB_OFFLOAD_THRESHOLD", "20000") or "20000")
+
+# ポインタを load_text で解決している列（check_and_post_minutes / post_final_minutes）
+OFFLOAD_COLUMNS = ("formatted_minutes", "final_minutes")
+POINTER_PREFIX = "blob:sha256:"
+
+
+class BlobLoadError(RuntimeError):
+    """ポインタの本文を読み込めない（保存先未設定・見つからない・ハッシュ不一致）"""
+
+
+class LocalBlobStore:
+    """ローカルディレクトリに <先頭2文字>/<ハッシュ> で保存"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class DriveBlobStore:
+    """Drive のフォルダ（または appDataFolder）にハッシュ名のファイルとして保存"""
+
+    def __init__(self, folder_id: str) -> None:
+        self.folder_id = folder_id
+        self._file_ids: Dict[str, str] = {}
+
+    def _find(self, key: str) -> Optional[str]:
+        if key in self._file_ids:
+            return self._file_ids[key]
+        from .google_clients import drive
+        params = {
+            "q": f"name = '{key}' and '{self.folder_id}' in parents and trashed = false",
+            "fields": "files(id)",
+            "pageSize": 1,
+        }
+        if self.folder_id == "appDataFolder":
+            params["spaces"] = "appDataFolder"
+        else:
+            params["supportsAllDrives"] = True
+            params["includeItemsFromAllDrives"] = True
+        files = drive().files().list(**params).execute().get("files", [])
+        if not files:
+            return None
+        self._file_ids[key] = files[0]["id"]
+        return self._file_ids[key]
+
+    def put(self, key: str, data: bytes) -> None:
+        if self._find(key):
+            return
+        from googleapiclient.http import MediaInMemoryUpload
+        from .google_clients import drive
+        created = drive().files().create(
+            body={"name": key, "parents": [self.folder_id], "mimeType": "text/plain"},
+            media_body=MediaInMemoryUpload(data, mimetype="text/plain"),
+            fields="id",
+            supportsAllDrives=True,
+        ).execute()
+        self._file_ids[key] = created["id"]
+
+    def get(self, key: str) -> Optional[bytes]:
+        file_id = self._find(key)
+        if not file_id:
+            return None
+        from .google_clients import drive
+        return drive().files().get_media(fileId=file_id, supportsAllDrives=True).execute()
+
+
+_STORE = None
+
+
+def get_blob_store():
+    """設定に応じた保存先を返す（未設定なら None）"""
+    global _STORE
+    if _STORE is None:
+        if BLOB_STORE_DIR:
+            _STORE = LocalBlobStore(BLOB_STORE_DIR)
+        elif BLOB_DRIVE_FOLDER_ID:
+            _STORE = DriveBlobStore(BLOB_DRIVE_FOLDER_ID)
+    return _STORE
+
+
+def is_blob_pointer(value: str) -> bool:
+    return isinstance(value, str) and value.startswith(POINTER_PREFIX)
+
+
+def offload_text(text: str, threshold: Optional[int] = None) -> str:
+    """閾値を超える本文を保存し、ポインタを返す（保存先未設定・閾値以下ならそのまま返す）"""
+    limit = BLOB_OFFLOAD_THRESHOLD if threshold is None else threshold
+    store = get_blob_store()
+    if store is None or not text or len(text) <= limit or is_blob_pointer(text):
+        return text
+    data = text.encode("utf-8")
+    key = hashlib.sha256(data).hexdigest()
+    try:
+        store.put(key, data)
+    except Exception as e:
+        print(f"[blob_store] Failed to offload text ({len(text)} chars): {e}")
+        return text
+    print(f"[blob_store] Offloaded {len(text)} chars to {key[:12]}...")
+    return f"{POINTER_PREFIX}{key}"
+
+
+def load_text(value: str) -> str:
+    """
+    ポインタなら本文を読み込んで返す（ポインタでなければそのまま）
+    読み込めない場合は BlobLoadError（ポインタをそのまま投稿せず、黙って飛ばしもしないため）
+    """
+    if not is_blob_pointer(value):
+        return value
+    key = value.strip()[len(POINTER_PREFIX):]
+    store = get_blob_store()
+    if store is None:
+        raise BlobLoadError(f"blob store is not configured; cannot load {key[:12]}...")
+    try:
+        data = store.get(key)
+    except Exception as e:
+        raise BlobLoadError(f"failed to load {key[:12]}...: {e}") from e
+    if data is None:
+        raise BlobLoadError(f"blob {key[:12]}... is missing from the store")
+    if hashlib.sha256(data).hexdigest() != key:
+        raise BlobLoadError(f"blob {key[:12]}... is corrupted (digest mismatch)")
+    return data.decode("utf-8")
+
+
+def offload_row(row: Dict[str, str]) -> Dict[str, str]:
+    """行データの本文列（OFFLOAD_COLUMNS）に offload_text を適用した新しい辞書を返す"""
+    out = dict(row)
+    for col in OFFLOAD_COLUMNS:
+        if col in out and isinstance(out[col], str):
+            out[col] = offload_text(out[col])
+    return out
@@ -33,34 +33,53 @@ HOLIDAY_CALENDAR_ID = os.getenv(
 ).strip()
 
 
-def _jst_range_for_date(d: date) -> tuple[str, str]:
-    start = JST.localize(datetime(d.year, d.month, d.day, 0, 0, 0))
-    end = start + timedelta(days=1)
-    return start.isoformat(), end.isoformat()
-
-
 def is_weekend(d: date) -> bool:
     # Monday=0 ... Sunday=6
     return d.weekday() >= 5
 
 
-@lru_cache(maxsize=512)
+@lru_cache(maxsize=8)
+def _holidays_for_year(year: int) -> frozenset:
+    """祝日カレンダーの1年分を1回の events.list（ページング込み）で取得し、祝日の日付集合を返す"""
+    svc = calendar_client()
+    start = JST.localize(datetime(year, 1, 1))
+    end = JST.localize(datetime(year + 1, 1, 1))
+    holidays = set()
+    page_token = None
+    while True:
+        res = svc.events().list(
+            calendarId=HOLIDAY_CALENDAR_ID,
+            timeMin=start.isoformat(),
+            timeMax=end.isoformat(),
+            singleEvents=True,
+            maxResults=250,
+            pageToken=page_token,
+            fields="nextPageToken,items(start,end)",
+        ).execute()
+        for item in res.get("items", []):
+            # 祝日は終日イベント（start.date 以上 end.date 未満）
+            first = item.get("start", {}).get("date")
+            if not first:
+                continue
+            cur = date.fromisoformat(first)
+            last = date.fromisoformat(item.get("end", {}).get("date") or first)
+            while True:
+                holidays.add(cur)
+                cur += timedelta(days=1)
+                if cur >= last:
+                    break
+        page_token = res.get("nextPageToken")
+        if not page_token:
+            break
+    return frozenset(holidays)
+
+
 def is_public_holiday(d: date) -> bool:
-    """Check if given date is a public holiday via Google Calendar."""
+    """Check if given date is a public holiday via Google Calendar (one lookup per year)."""
     try:
         if not HOLIDAY_CALENDAR_ID:
             return False
-        svc = calendar_client()
-        time_min, time_max = _jst_range_for_date(d)
-        items = svc.events().list(
-            calendarId=HOLIDAY_CALENDAR_ID,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy="startTime",
-            maxResults=5,
-        ).execute().get("items", [])
-        return len(items) > 0
+        return d in _holidays_for_year(d.year)
     except Exception:
         # Fail-open: if API fails, do not block by treating as business day
         return False
@@ -4,20 +4,29 @@ formatted_minutesが埋まったら、参加者メンション付きでSlackに
 """
 import os
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence, Mapping
 from dateutil import tz
-from .google_clients import calendar as calendar_client
-from .slack_client import SlackClient
+from .google_clients import calendar as calendar_client, batch_execute
+from .slack_client import SlackClient, outbox_key, outbox_row
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst_str,
 )
 from .text_split import split_main_and_thread
+from .blob_store import BlobLoadError, load_text
 
 # Slackの投稿先はシートの channel_id のみを使用する（環境変数は使わない）
 
+# スナップショットで読む列（当日分の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["date", "title"]
+
+# outbox（Slack 投稿の送信待ち行列）上のステージ名
+OUTBOX_STAGE = "minutes"
+
 
 def get_calendar_participants(date: str, title: str = "", meeting_key: str = "", require_exact_title: bool = False) -> List[str]:
     """
@@ -51,23 +60,26 @@ def get_calendar_participants(date: str, title: str = "", meeting_key: str = "",
         else:
             calendar_ids = [os.getenv("CALENDAR_ID", "primary")]
         
-        # 複数カレンダーを横断して当日イベントを収集
+        # 複数カレンダーを横断して当日イベントを収集（1回のバッチリクエストにまとめる）
+        requests = [
+            cal_service.events().list(
+                calendarId=cal_id,
+                timeMin=time_min,
+                timeMax=time_max,
+                singleEvents=True,
+                orderBy="startTime"
+            )
+            for cal_id in calendar_ids
+        ]
         events = []
-        for cal_id in calendar_ids:
-            try:
-                res = cal_service.events().list(
-                    calendarId=cal_id,
-                    timeMin=time_min,
-                    timeMax=time_max,
-                    singleEvents=True,
-                    orderBy="startTime"
-                ).execute()
-                items = res.get("items", [])
-                if items:
-                    events.extend(items)
-            except Exception as _:
+        for cal_id, (res, error) in zip(calendar_ids, batch_execute(cal_service, requests)):
+            if error is not None:
                 # 1カレンダーの失敗は致命ではないため継続
+                print(f"[check_and_post_minutes] Calendar {cal_id} lookup failed: {error}")
                 continue
+            items = (res or {}).get("items", [])
+            if items:
+                events.extend(items)
         
         if not events:
             print(f"[check_and_post_minutes] No calendar events found on {date}")
@@ -146,33 +158,20 @@ def get_calendar_participants(date: str, title: str = "", meeting_key: str = "",
         return []
 
 
-def email_to_slack_id(slack_client: SlackClient, email: str) -> Optional[str]:
-    """メールアドレスからSlack IDに変換（ドメイン変換対応）"""
-    # まず元のメールで試す
-    slack_id = slack_client.lookup_user_id_by_email(email)
-    if slack_id:
-        return slack_id
-    
-    # 見つからない場合、ドメインを変換して再試行
-    if "@initialbrain.jp" in email:
-        converted_email = email.replace("@initialbrain.jp", "@nexx-inc.jp")
-        print(f"[check_and_post_minutes] Trying converted email: {email} -> {converted_email}")
-        slack_id = slack_client.lookup_user_id_by_email(converted_email)
-        if slack_id:
-            return slack_id
-    
-    return None
-
-
-def check_and_post_for_sheet(sheet_name: str, slack_client: SlackClient):
+def check_and_post_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     """1つのシートに対して議事録投稿チェックを実行"""
     print(f"[check_and_post_minutes] Checking sheet: {sheet_name}")
     
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
     
     # 現在の日付（JST）
     tz_info = tz.gettz(os.getenv("DEFAULT_TIMEZONE", "Asia/Tokyo"))
     today = datetime.now(tz_info).strftime("%Y-%m-%d")
+
+    # 当日分の行だけ formatted_minutes などを含む全列を取得
+    rows = with_full_rows(sheet_name, rows, lambda r: (r.get("date", "").strip())[:10] == today)
     
     print(f"[check_and_post_minutes] Today's date (JST): {today}")
     print(f"[check_and_post_minutes] Found {len(rows)} rows in sheet: {sheet_name}")
@@ -241,18 +240,20 @@ def check_and_post_for_sheet(sheet_name: str, slack_client: SlackClient):
         # 参加者は既に取得済み（安全のため未取得なら再取得）
         if not participant_emails:
             participant_emails = get_calendar_participants(date_day, title, meeting_key, require_exact_title=True)
-        mentions = []
-        
-        for email in participant_emails:
-            slack_id = email_to_slack_id(slack_client, email)
-            if slack_id:
-                mentions.append(f"<@{slack_id}>")
-        
-        mentions_text = " ".join(mentions) if mentions else ""
+        mentions_text = slack_client.mention_text(participant_emails)
         
         # 参加者メールをカンマ区切りで保存用に整形
         participants_str = ", ".join(participant_emails) if participant_emails else ""
         
+        # 退避済みの本文（blob:sha256:...）はここで初めて読み込む
+        try:
+            formatted_minutes = load_text(formatted_minutes).strip()
+        except BlobLoadError as e:
+            print(f"[check_and_post_minutes] ERROR: formatted_minutes could not be loaded for: {title} ({e}); not posting")
+            continue
+        if not formatted_minutes:
+            continue
+
         # 本文とスレッドに分割（決定事項の詳細 以下はスレッドへ）
         main_text, thread_text = split_main_and_thread(formatted_minutes)
 
@@ -265,78 +266,87 @@ def check_and_post_for_sheet(sheet_name: str, slack_client: SlackClient):
             message_parts.append(main_text)
         message = "\n".join(message_parts).rstrip()
         
-        # Slack投稿（親メッセージ）
+        # 修正依頼の案内（スレッドに投稿）
+        review_user_id = os.getenv("REVIEW_USER_ID", "").strip()  # 例: U0123456789
+        trigger_name = os.getenv("REVIEW_TRIGGER_KEYWORDS", "DR.ベガパンク").split(",")[0].strip()
+        # 参加者メンション（親メッセージと同じもの）
+        notify_text = (mentions_text + "\n\n") if mentions_text else ""
+        review_target_text = f"<@{review_user_id}>" if review_user_id else f"@{trigger_name}"
+        guidance = (
+            f"{notify_text}議事録を確認し、修正が必要な場合は参加者間で合意の上、こちらのスレッドで下記フォーマットで{review_target_text}宛に送信ください。\n"
+            f"テキストを送るときは、本文に必ず @DRベガパンク をつけてください。\n"
+            f"修正要望がない場合も議事録の内容を確認した旨を返信してください。\n"
+            f"【期日:明日午前中9時まで】\n"
+            f"⇩修正依頼フォーマット⇩\n"
+            f"該当箇所\n"
+            f"→\n\n"
+            f"修正内容\n"
+            f"→ "
+        )
+
+        # 親メッセージ → 決定事項の詳細（あれば）→ 案内 の順に、outbox 経由で1回だけ投稿
+        # （前回の実行で投稿済みなら再投稿せず、記録済みの ts を使う）
+        messages = [{"text": message}]
+        if thread_text:
+            messages.append({"text": thread_text, "reply_to": 0})
+        messages.append({"text": guidance, "reply_to": 0})
+        row_number = row.get("_row_number")
         print(f"[check_and_post_minutes] Posting minutes for: {title}")
-        ts = slack_client.post_message(channel_id, message)
+        sent = slack_client.send_once(outbox_key(sheet_name, row, OUTBOX_STAGE, date_day), channel_id, messages)
+        ts = sent[0]
         
         if ts:
             # 成功: updated_at、participants、minutes_thread_tsを更新（minutes_postedは不使用）
-            row_number = row.get("_row_number")
             if row_number:
                 update_row(sheet_name, row_number, {
                     "updated_at": now_jst_str(),
                     "participants": participants_str,
                     "minutes_thread_ts": ts,
-                })
+                }, current=row, flush=True)
                 print(f"[check_and_post_minutes] Successfully posted and updated row {row_number}")
-
-            # 決定事項の詳細 以降があればスレッドに投稿
-            try:
-                if thread_text:
-                    slack_client.post_message(channel_id, thread_text, thread_ts=ts)
-                    print("[check_and_post_minutes] Posted detail section in thread")
-            except Exception as e:
-                print(f"[check_and_post_minutes] Failed to post detail thread: {e}")
-
-            # 追記: 修正依頼の案内をスレッドに投稿
-            try:
-                review_user_id = os.getenv("REVIEW_USER_ID", "").strip()  # 例: U0123456789
-                trigger_name = os.getenv("REVIEW_TRIGGER_KEYWORDS", "DR.ベガパンク").split(",")[0].strip()
-                # 参加者メンション（必要に応じて）
-                notify_mentions = []
-                for email in participant_emails:
-                    sid = email_to_slack_id(slack_client, email)
-                    if sid:
-                        notify_mentions.append(f"<@{sid}>")
-                notify_text = (" ".join(notify_mentions) + "\n\n") if notify_mentions else ""
-                review_target_text = f"<@{review_user_id}>" if review_user_id else f"@{trigger_name}"
-                guidance = (
-                    f"{notify_text}議事録を確認し、修正が必要な場合は参加者間で合意の上、こちらのスレッドで下記フォーマットで{review_target_text}宛に送信ください。\n"
-                    f"テキストを送るときは、本文に必ず @DRベガパンク をつけてください。\n"
-                    f"修正要望がない場合も議事録の内容を確認した旨を返信してください。\n"
-                    f"【期日:明日午前中9時まで】\n"
-                    f"⇩修正依頼フォーマット⇩\n"
-                    f"該当箇所\n"
-                    f"→\n\n"
-                    f"修正内容\n"
-                    f"→ "
-                )
-                slack_client.post_message(channel_id, guidance, thread_ts=ts)
-                print("[check_and_post_minutes] Posted review guidance in thread")
-            except Exception as e:
-                print(f"[check_and_post_minutes] Failed to post review guidance: {e}")
+            if all(sent[1:]):
+                print("[check_and_post_minutes] Posted detail section and review guidance in thread")
+            else:
+                print("[check_and_post_minutes] Some thread posts are pending; they will be retried on the next run")
         else:
             print(f"[check_and_post_minutes] Failed to post minutes for: {title}")
 
 
+def record_resumed_posts(resumed) -> None:
+    """再開して投稿できた議事録の ts を、まだ記録していない行の minutes_thread_ts に書き戻す"""
+    resumed = [(key, sent) for key, sent in resumed if sent and sent[0]]
+    if not resumed:
+        return
+    sheets = dict(iter(load_snapshot(columns=["doc_url", "minutes_thread_ts"])))
+    for key, sent in resumed:
+        row = outbox_row(key, sheets.get(key[0], ()))
+        if row is None or row.get("minutes_thread_ts"):
+            continue
+        update_row(key[0], row["_row_number"], {
+            "minutes_thread_ts": sent[0],
+            "updated_at": now_jst_str(),
+        }, current=row, flush=True)
+        print(f"[check_and_post_minutes] Recorded resumed post ts={sent[0]} in row {row['_row_number']} of {key[0]}")
+
+
 def main():
     """メイン処理"""
     # 初回議事録（formatted_minutes）投稿は MINUTES ボット
     slack_client = SlackClient(token=os.getenv("SLACK_BOT_TOKEN_MINUTES", "").strip() or None)
-    
-    # 全シートをチェック
-    sheet_names = get_all_sheet_names()
-    
-    for sheet_name in sheet_names:
-        # システムシートはスキップ
-        if sheet_name.lower() in ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]:
-            continue
-        
-        try:
-            check_and_post_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[check_and_post_minutes] Error processing sheet {sheet_name}: {e}")
-            continue
+    # 前回の実行で送り切れなかった投稿（スレッドの詳細・案内など）を先に送る
+    record_resumed_posts(slack_client.resume_outbox(OUTBOX_STAGE))
+
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
+
+    # 行更新はステージ終了時にまとめて書き込む（Slack 投稿の記録はその場で書き込む）
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                check_and_post_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[check_and_post_minutes] Error processing sheet {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
@@ -5,18 +5,23 @@ Slackスレッドから回答を収集し、シートのhearing_responses01-04
 """
 import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Sequence, Mapping
 from .slack_client import SlackClient
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst,
     now_jst_str,
 )
 
 DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "").strip()
 
+# スナップショットで読む列（収集対象の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["next_meeting_date", "hearing_thread_ts"]
+
 
 def should_collect_responses(next_meeting_date_str: str) -> bool:
     """従来ルール: next_meeting_dateの1日前09:00以降。"""
@@ -73,11 +78,19 @@ def collect_thread_responses(slack_client: SlackClient, channel_id: str, thread_
     return texts
 
 
-def collect_responses_for_sheet(sheet_name: str, slack_client: SlackClient):
+def collect_responses_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     """1つのシートに対してヒアリング回答収集を実行"""
     print(f"[collect_hearing_responses] Checking sheet: {sheet_name}")
     
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
+
+    # 収集対象になり得る行だけ全列を取得
+    rows = with_full_rows(sheet_name, rows, lambda r: (
+        bool(r.get("hearing_thread_ts", "").strip())
+        and should_collect_responses(r.get("next_meeting_date", "").strip())
+    ))
     
     for row in rows:
         next_meeting_date = row.get("next_meeting_date", "").strip()
@@ -136,19 +149,17 @@ def main():
     """メイン処理"""
     slack_client = SlackClient()
     
-    # 全シートをチェック
-    sheet_names = get_all_sheet_names()
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
     
-    for sheet_name in sheet_names:
-        # システムシートはスキップ
-        if sheet_name.lower() in ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]:
-            continue
-        
-        try:
-            collect_responses_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[collect_hearing_responses] Error processing sheet {sheet_name}: {e}")
-            continue
+    # 行更新はステージ終了時にまとめて書き込む
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                collect_responses_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[collect_hearing_responses] Error processing sheet {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
@@ -5,13 +5,15 @@
 """
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence, Mapping
 from datetime import datetime, timedelta
 from .slack_client import SlackClient
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst,
     now_jst_str,
 )
@@ -19,6 +21,9 @@ from .minutes_repo import (
 DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "").strip()
 REVIEW_USER_ID = os.getenv("REVIEW_USER_ID", "").strip()  # 例: U0123456789（必須。実メンションのみ対象）
 
+# スナップショットで読む列（収集対象の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["date", "minutes_thread_ts"]
+
 
 def reply_matches(text: str) -> bool:
     """実メンション <@REVIEW_USER_ID> を含む投稿のみを対象とする。"""
@@ -45,9 +50,17 @@ def should_collect_after_minutes(meeting_date_iso_or_date: str) -> bool:
         return False
 
 
-def collect_for_sheet(sheet_name: str, slack_client: SlackClient):
+def collect_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     print(f"[collect_review_requests] Checking sheet: {sheet_name}")
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
+
+    # 収集対象になり得る行だけ全列を取得
+    rows = with_full_rows(sheet_name, rows, lambda r: (
+        bool(r.get("minutes_thread_ts", "").strip())
+        and should_collect_after_minutes((r.get("date", "") or "").strip())
+    ))
 
     for row in rows:
         channel_id = row.get("channel_id", "").strip() or DEFAULT_CHANNEL_ID
@@ -94,23 +107,24 @@ def collect_for_sheet(sheet_name: str, slack_client: SlackClient):
                 "review_requests03": texts[2],
                 "review_requests04": texts[3],
                 "updated_at": now_jst_str(),
-            })
+            }, current=row)
             print(f"[collect_review_requests] Saved {min(4, len(matches))} requests to row {row_number}")
 
 
 def main():
     # 収集と完成版投稿はレビュー用ボットで実行
     slack_client = SlackClient(token=os.getenv("SLACK_BOT_TOKEN_REVIEW", "").strip() or None)
-    for sheet_name in get_all_sheet_names():
-        if sheet_name.lower() in [
-            "mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"
-        ]:
-            continue
-        try:
-            collect_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[collect_review_requests] Error on {sheet_name}: {e}")
-            continue
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
+    
+    # 行更新はステージ終了時にまとめて書き込む
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                collect_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[collect_review_requests] Error on {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
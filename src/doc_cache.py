@@ -0,0 +1,130 @@
+"""
+Docs 本文のローカルキャッシュ（SQLite）
+Drive のファイルID + リビジョン（headRevisionId / modifiedTime）をキーに本文を保持し、
+文書が更新されていなければ Docs API を呼ばずに返す
+合計サイズが DOC_CACHE_MAX_BYTES を超えたら、最後に使われた時刻が古いものから削除する
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+DOC_CACHE_PATH = os.getenv("DOC_CACHE_PATH", ".cache/doc_cache.sqlite3").strip()
+DOC_CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_BYTES", str(200 * 1024 * 1024)) or "0")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    file_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (file_id, variant)
+);
+CREATE INDEX IF NOT EXISTS docs_accessed_at ON docs (accessed_at);
+"""
+
+
+class DocCache:
+    """(ファイルID, 用途) ごとに最新リビジョンの本文を1つだけ保持するキャッシュ"""
+
+    def __init__(self, path: str, max_bytes: int = DOC_CACHE_MAX_BYTES) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        # バックフィルのワーカースレッドからも使うため、接続は共有してロックで直列化する
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, file_id: str, revision: str, variant: str = "text") -> Optional[str]:
+        """同じリビジョンの本文があれば返す（無ければ None）"""
+        if not revision:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body FROM docs WHERE file_id = ? AND variant = ? AND revision = ?",
+                (file_id, variant, revision),
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE docs SET accessed_at = ? WHERE file_id = ? AND variant = ?",
+                    (time.time(), file_id, variant),
+                )
+        return row[0]
+
+    def put(self, file_id: str, revision: str, body: str, variant: str = "text") -> None:
+        """本文を保存（同じファイルの古いリビジョンは置き換え）"""
+        if not revision:
+            return
+        size = len(body.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO docs (file_id, variant, revision, size, accessed_at, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_id, variant, revision, size, time.time(), body),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば、使われていない順に削除"""
+        if not self.max_bytes:
+            return
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM docs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for file_id, variant, size in self.conn.execute(
+            "SELECT file_id, variant, size FROM docs ORDER BY accessed_at"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((file_id, variant))
+            total -= size
+        self.conn.executemany("DELETE FROM docs WHERE file_id = ? AND variant = ?", victims)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM docs").fetchone()[0]
+
+
+_CACHE: Optional[DocCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_doc_cache() -> Optional[DocCache]:
+    """DOC_CACHE_PATH が設定されていればキャッシュを返す（空なら None）"""
+    global _CACHE
+    if not DOC_CACHE_PATH:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = DocCache(DOC_CACHE_PATH)
+    return _CACHE
+
+
+def cached_text(file_id: str, revision: str, fetch: Callable[[], str], variant: str = "text") -> str:
+    """
+    キャッシュにあればそれを返し、無ければ fetch() で取得して保存する
+    revision が空（リビジョン不明）の場合はキャッシュを使わない
+    """
+    cache = get_doc_cache()
+    if cache is not None:
+        hit = cache.get(file_id, revision, variant)
+        if hit is not None:
+            print(f"[doc_cache] Hit: {file_id} ({revision})")
+            return hit
+    body = fetch()
+    if cache is not None and body:
+        cache.put(file_id, revision, body, variant)
+    return body
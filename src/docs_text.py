@@ -0,0 +1,139 @@
+"""
+Google Docs の本文テキスト抽出
+- documents.get に fields マスクを付け、本文・表・ヘッダー/フッターの textRun だけを取得する
+- レスポンスはチャンク単位で読み、textRun.content の文字列だけを取り出す（JSON 全体を木にしない）
+"""
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+DOCS_API_URL = "https://docs.googleapis.com/v1/documents/{doc_id}"
+STREAM_CHUNK_SIZE = 64 * 1024
+# 複数の Docs をまとめて取得するときの1バッチの件数
+# バッチのレスポンスはストリーミングできず全件分をメモリに載せるため、API 上限（100）より小さくする
+DOCS_BATCH_SIZE = int(os.getenv("DOCS_BATCH_SIZE", "10") or "10")
+
+# 段落の textRun（表のセル内の段落・入れ子の表を含む）
+_PARAGRAPH = "paragraph(elements(textRun(content)))"
+_CELL_CONTENT = f"content({_PARAGRAPH},table(tableRows(tableCells(content({_PARAGRAPH})))))"
+_STRUCTURAL = f"{_PARAGRAPH},table(tableRows(tableCells({_CELL_CONTENT}))),tableOfContents(content({_PARAGRAPH}))"
+# ヘッダー/フッターは ID をキーとするマップのため丸ごと取得（本文に比べて小さい）
+DOCS_TEXT_FIELDS = f"body(content({_STRUCTURAL})),headers,footers"
+
+# "content": の直後が文字列なら textRun の本文（段落・セルの content は配列）
+_CONTENT_KEY = re.compile(rb'"content"\s*:\s*')
+# 開始の " の直後から、エスケープされていない閉じの " までに一致
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# 部分的に届いたキーを取りこぼさないよう、一致しなかったときに残す末尾のバイト数
+_KEY_TAIL = 64
+
+
+def iter_text_runs(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    documents.get の JSON をバイト列のチャンクで受け取り、textRun.content を出現順に返す
+    保持するのは未処理の末尾（途中で切れた文字列など）だけ
+    """
+    buf = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf = buf + chunk if buf else chunk
+        pos = 0
+        while True:
+            m = _CONTENT_KEY.search(buf, pos)
+            if m is None:
+                pos = max(pos, len(buf) - _KEY_TAIL)
+                break
+            start = m.end()
+            if start >= len(buf):
+                # 値の先頭がまだ届いていない
+                pos = m.start()
+                break
+            if buf[start:start + 1] != b'"':
+                pos = start
+                continue
+            s = _STRING_BODY.match(buf, start + 1)
+            if s is None:
+                # 文字列が途中で切れている
+                pos = m.start()
+                break
+            yield json.loads(buf[start:s.end()])
+            pos = s.end()
+        buf = buf[pos:]
+
+
+def extract_text(document: Any) -> str:
+    """
+    解析済みの documents.get レスポンスから textRun.content を出現順に連結
+    （段落・表のセル・目次・ヘッダー/フッターを含む）
+    """
+    parts: List[str] = []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            run = node.get("textRun")
+            if isinstance(run, dict) and isinstance(run.get("content"), str):
+                parts.append(run["content"])
+            for key, value in node.items():
+                if key != "textRun" and isinstance(value, (dict, list)):
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(document)
+    return "".join(parts).strip()
+
+
+def stream_doc_text(doc_id: str, chunk_size: int = STREAM_CHUNK_SIZE) -> str:
+    """Docs API のレスポンスをストリーミングで読み、本文テキストを返す"""
+    from .google_clients import session
+
+    with session().get(
+        DOCS_API_URL.format(doc_id=doc_id),
+        params={"fields": DOCS_TEXT_FIELDS},
+        stream=True,
+        timeout=120,
+    ) as resp:
+        resp.raise_for_status()
+        return "".join(iter_text_runs(resp.iter_content(chunk_size=chunk_size))).strip()
+
+
+def get_doc_text(doc_id: str) -> str:
+    """
+    Docs の本文テキストを取得
+    ストリーミング取得に失敗した場合は、同じ fields マスクで documents.get を呼んで抽出する
+    """
+    try:
+        return stream_doc_text(doc_id)
+    except Exception as e:
+        print(f"[docs_text] Streaming fetch failed for {doc_id} ({e}); falling back to documents.get")
+    from .google_clients import docs
+    document = docs().documents().get(documentId=doc_id, fields=DOCS_TEXT_FIELDS).execute()
+    return extract_text(document)
+
+
+def get_doc_texts(doc_ids: Sequence[str], batch_size: int = DOCS_BATCH_SIZE) -> Dict[str, str]:
+    """
+    複数の Docs の本文テキストを、batch_size 件ずつのバッチリクエストでまとめて取得
+    バッチ内で失敗した文書は get_doc_text で1件ずつ取り直す（それも失敗したら結果に含めない）
+    """
+    from .google_clients import batch_execute, docs
+
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if not doc_ids:
+        return {}
+    service = docs()
+    requests = [service.documents().get(documentId=doc_id, fields=DOCS_TEXT_FIELDS) for doc_id in doc_ids]
+    texts: Dict[str, str] = {}
+    for doc_id, (document, error) in zip(doc_ids, batch_execute(service, requests, max_size=batch_size)):
+        if error is None:
+            texts[doc_id] = extract_text(document or {})
+            continue
+        print(f"[docs_text] Batch fetch failed for {doc_id} ({error}); fetching individually")
+        try:
+            texts[doc_id] = get_doc_text(doc_id)
+        except Exception as e:
+            print(f"[docs_text] Error getting doc content for {doc_id}: {e}")
+    return texts
@@ -2,88 +2,331 @@
 Drive監視スクリプト
 指定フォルダ内の新規Google Docsを検知し、シートに追加
 """
+import argparse
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from .google_clients import drive, docs, calendar
+from typing import Any, List, Dict, Optional, Sequence, Tuple
+from .google_clients import drive, calendar, http_status
 from .minutes_repo import (
-    get_all_sheet_names,
-    read_sheet_rows,
-    append_row,
+    load_snapshot,
+    load_archive_snapshot,
+    archive_sheet_name,
+    prefetch_headers,
+    append_rows,
     now_jst_str,
     date_plus_days,
 )
+from .minutes_row import doc_id_from_url
+from .blob_store import offload_row
+from .docs_text import get_doc_text, get_doc_texts
+from .doc_cache import cached_text, get_doc_cache
 
 DRIVE_FOLDER_ID = os.getenv("DRIVE_FOLDER_ID", "").strip()
+# 複数フォルダはカンマ区切り（未設定なら DRIVE_FOLDER_ID のみ）
+DRIVE_FOLDER_IDS = [f.strip() for f in os.getenv("DRIVE_FOLDER_IDS", "").split(",") if f.strip()] or ([DRIVE_FOLDER_ID] if DRIVE_FOLDER_ID else [])
+# サブフォルダも再帰的に監視する
+DRIVE_RECURSIVE = os.getenv("DRIVE_RECURSIVE", "").strip().lower() in ("1", "true", "yes")
+DRIVE_FOLDER_TREE_PATH = os.getenv("DRIVE_FOLDER_TREE_PATH", ".cache/drive_folder_tree.json").strip()
+DRIVE_FOLDER_TREE_TTL_HOURS = int(os.getenv("DRIVE_FOLDER_TREE_TTL_HOURS", "24") or "24")
+# files.list の q の長さの上限（'id' in parents を or でつなげる数をこれで決める）
+DRIVE_QUERY_MAX_LENGTH = int(os.getenv("DRIVE_QUERY_MAX_LENGTH", "2000") or "2000")
 DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Tokyo")
 CALENDAR_ID = os.getenv("CALENDAR_ID", "primary").strip()
 WORKSPACE_DOMAINS = [d.strip() for d in os.getenv("WORKSPACE_DOMAINS", "").split(",") if d.strip()]
 LOOKBACK_HOURS = int(os.getenv("DRIVE_LOOKBACK_HOURS", "3") or "3")
 DEFAULT_TARGET_SHEET = os.getenv("DEFAULT_TARGET_SHEET", "").strip()
 
+# changes: Drive の changes.list を保存済みのページトークンから読む（既定）
+# lookback: 従来通り直近 DRIVE_LOOKBACK_HOURS 時間に作成されたDocsを検索する
+DRIVE_MONITOR_MODE = os.getenv("DRIVE_MONITOR_MODE", "changes").strip().lower() or "changes"
+DRIVE_CHANGES_STATE_PATH = os.getenv("DRIVE_CHANGES_STATE_PATH", ".cache/drive_changes_state.json").strip()
+# changes.list がページトークンの失効・不正で返すステータス（これ以外のエラーではトークンを取り直さない）
+INVALID_PAGE_TOKEN_STATUSES = (400, 404, 410)
+BACKFILL_STATE_PATH = os.getenv("DRIVE_BACKFILL_STATE_PATH", ".cache/drive_backfill_state.json").strip()
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4") or "4")
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "50") or "50")
+DOC_MIME_TYPE = "application/vnd.google-apps.document"
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+CHANGE_FILE_FIELDS = "id, name, mimeType, createdTime, modifiedTime, webViewLink, parents, trashed"
 
-def get_doc_text_content(doc_id: str) -> str:
-    """Google DocsのIDから本文テキストを取得"""
+# 重複判定・channel_id の引き継ぎに使う列だけを読む
+INDEX_COLUMNS = ["doc_url", "channel_id"]
+
+
+def get_doc_text_content(doc_id: str, revision: str = "") -> str:
+    """
+    Google DocsのIDから本文テキストを取得（表・ヘッダー/フッターを含む）
+    revision（modifiedTime など）が同じなら、ローカルのキャッシュから返す
+    """
     try:
-        # Docs APIで取得
-        doc_service = docs()
-        document = doc_service.documents().get(documentId=doc_id).execute()
-        
-        # テキストを抽出
-        content = document.get("body", {}).get("content", [])
-        text_parts = []
-        
-        for element in content:
-            if "paragraph" in element:
-                paragraph = element["paragraph"]
-                for elem in paragraph.get("elements", []):
-                    if "textRun" in elem:
-                        text_parts.append(elem["textRun"].get("content", ""))
-        
-        full_text = "".join(text_parts).strip()
-        return full_text
-    
+        return cached_text(doc_id, revision, lambda: get_doc_text(doc_id))
     except Exception as e:
         print(f"[drive_monitor] Error getting doc content for {doc_id}: {e}")
         return ""
 
 
-def list_docs_in_folder(folder_id: str, hours_ago: int = 3) -> List[Dict[str, str]]:
+def prefetch_doc_texts(doc_files: Sequence[Dict[str, str]]) -> Dict[str, str]:
     """
-    指定フォルダ内のGoogle Docsをリスト（共有ドライブ対応）
-    hours_ago: 過去N時間以内に作成されたファイルのみ取得（初回は大きめの値を推奨）
+    複数のDocsの本文をまとめて取得（ファイルID -> 本文）
+    キャッシュにあるものはそのまま使い、残りはバッチリクエストで取得してキャッシュに保存する
     """
-    drive_service = drive()
-    
-    # 過去N時間以内のファイルを検索
-    from datetime import datetime, timezone
+    cache = get_doc_cache()
+    texts: Dict[str, str] = {}
+    misses: List[Dict[str, str]] = []
+    for doc_file in doc_files:
+        hit = cache.get(doc_file["id"], doc_file.get("modifiedTime", "")) if cache is not None else None
+        if hit is not None:
+            texts[doc_file["id"]] = hit
+        else:
+            misses.append(doc_file)
+    if not misses:
+        return texts
+    print(f"[drive_monitor] Fetching {len(misses)} doc(s) in batch ({len(texts)} cached)")
+    try:
+        fetched = get_doc_texts([doc_file["id"] for doc_file in misses])
+    except Exception as e:
+        # バッチが使えなければ build_doc_row で1件ずつ取得する
+        print(f"[drive_monitor] Batch doc fetch failed: {e}")
+        return texts
+    for doc_file in misses:
+        body = fetched.get(doc_file["id"])
+        if body is None:
+            continue
+        texts[doc_file["id"]] = body
+        if cache is not None and body:
+            cache.put(doc_file["id"], doc_file.get("modifiedTime", ""), body)
+    return texts
+
+
+def _cutoff_str(hours_ago: int) -> str:
+    """現在から hours_ago 時間前を RFC3339（UTC）で返す"""
+    from datetime import timezone
     cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
-    # RFC3339（UTC）に正規化
-    cutoff_str = cutoff_time.isoformat(timespec='seconds').replace('+00:00', 'Z')
-    
-    query = (
-        f"'{folder_id}' in parents "
-        f"and mimeType='application/vnd.google-apps.document' "
+    return cutoff_time.isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
+def _parent_queries(folder_ids: Sequence[str], condition: str) -> List[str]:
+    """
+    ('a' in parents or 'b' in parents ...) and condition の形のクエリを作る
+    DRIVE_QUERY_MAX_LENGTH を超える場合は複数のクエリに分割する
+    """
+    def combine(clauses: List[str]) -> str:
+        return f"({' or '.join(clauses)}) and {condition}"
+
+    queries: List[str] = []
+    clauses: List[str] = []
+    for folder_id in dict.fromkeys(folder_ids):
+        clause = f"'{folder_id}' in parents"
+        if clauses and len(combine(clauses + [clause])) > DRIVE_QUERY_MAX_LENGTH:
+            queries.append(combine(clauses))
+            clauses = []
+        clauses.append(clause)
+    if clauses:
+        queries.append(combine(clauses))
+    return queries
+
+
+def _list_files(query: str, fields: str, order_by: Optional[str] = None) -> List[Dict[str, str]]:
+    """files.list を nextPageToken を最後まで辿って実行（共有ドライブ対応）"""
+    drive_service = drive()
+    files: List[Dict[str, str]] = []
+    page_token = None
+    while True:
+        params = dict(
+            q=query,
+            fields=f"nextPageToken, files({fields})",
+            pageSize=1000,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True,
+        )
+        if order_by:
+            params["orderBy"] = order_by
+        results = drive_service.files().list(**params).execute()
+        files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+    return files
+
+
+def list_docs_in_folders(folder_ids: Sequence[str], hours_ago: int = 3, created_after: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    指定フォルダ群の直下にあるGoogle Docsをリスト（作成日時の新しい順）
+    hours_ago: 過去N時間以内に作成されたファイルのみ取得（初回は大きめの値を推奨）
+    created_after: 指定時はこの日時（RFC3339）以降に作成されたファイルを取得（hours_ago は無視）
+    """
+    # 過去N時間以内のファイルを検索（RFC3339（UTC）に正規化）
+    cutoff_str = created_after or _cutoff_str(hours_ago)
+    condition = (
+        f"mimeType='{DOC_MIME_TYPE}' "
         f"and createdTime > '{cutoff_str}' "
         f"and trashed=false"
     )
-    
-    # 共有ドライブ対応のパラメータを追加
-    results = drive_service.files().list(
-        q=query,
-        fields="files(id, name, createdTime, webViewLink)",
-        orderBy="createdTime desc",
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True
-    ).execute()
-    
-    files = results.get("files", [])
+
+    found: Dict[str, Dict[str, str]] = {}
+    queries = _parent_queries(folder_ids, condition)
+    for query in queries:
+        for f in _list_files(query, "id, name, createdTime, modifiedTime, webViewLink", order_by="createdTime desc"):
+            found[f["id"]] = f
+    files = sorted(found.values(), key=lambda f: f.get("createdTime", ""), reverse=True)
+
     print(f"[drive_monitor] Using cutoff createdTime > {cutoff_str} (UTC), hours_ago={hours_ago}")
-    print(f"[drive_monitor] Found {len(files)} new docs in folder {folder_id}")
-    
+    print(f"[drive_monitor] Found {len(files)} new docs in {len(set(folder_ids))} folder(s) ({len(queries)} queries)")
+
     return files
 
 
+def list_docs_in_folder(folder_id: str, hours_ago: int = 3, created_after: Optional[str] = None) -> List[Dict[str, str]]:
+    """指定フォルダ内のGoogle Docsをリスト（共有ドライブ対応）"""
+    return list_docs_in_folders([folder_id], hours_ago=hours_ago, created_after=created_after)
+
+
+def _walk_subfolders(root_ids: Sequence[str]) -> List[str]:
+    """ルートフォルダ以下の全フォルダIDを階層ごとにまとめて取得（ルートを含む）"""
+    all_ids = list(dict.fromkeys(root_ids))
+    seen = set(all_ids)
+    frontier = list(all_ids)
+    while frontier:
+        children: List[str] = []
+        for query in _parent_queries(frontier, f"mimeType='{FOLDER_MIME_TYPE}' and trashed=false"):
+            for f in _list_files(query, "id"):
+                if f["id"] not in seen:
+                    seen.add(f["id"])
+                    children.append(f["id"])
+        all_ids.extend(children)
+        frontier = children
+    return all_ids
+
+
+def _load_folder_tree() -> Dict[str, Any]:
+    try:
+        with open(DRIVE_FOLDER_TREE_PATH, "r", encoding="utf-8") as f:
+            tree = json.load(f)
+        return tree if isinstance(tree, dict) else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_folder_tree(tree: Dict[str, Any]) -> None:
+    directory = os.path.dirname(DRIVE_FOLDER_TREE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{DRIVE_FOLDER_TREE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tree, f, ensure_ascii=False)
+    os.replace(tmp, DRIVE_FOLDER_TREE_PATH)
+
+
+def get_monitored_folders(refresh: bool = False) -> List[str]:
+    """
+    監視対象のフォルダIDを返す
+    DRIVE_RECURSIVE 指定時はサブフォルダを含む（DRIVE_FOLDER_TREE_TTL_HOURS の間はキャッシュを使う）
+    """
+    if not DRIVE_RECURSIVE:
+        return list(DRIVE_FOLDER_IDS)
+    tree = _load_folder_tree()
+    age = time.time() - float(tree.get("fetched_at", 0) or 0)
+    if not refresh and tree.get("roots") == DRIVE_FOLDER_IDS and age < DRIVE_FOLDER_TREE_TTL_HOURS * 3600:
+        return list(tree.get("folders", DRIVE_FOLDER_IDS))
+    folders = _walk_subfolders(DRIVE_FOLDER_IDS)
+    _save_folder_tree({"roots": DRIVE_FOLDER_IDS, "folders": folders, "fetched_at": time.time()})
+    print(f"[drive_monitor] Folder tree refreshed: {len(folders)} folders under {len(DRIVE_FOLDER_IDS)} root(s)")
+    return folders
+
+
+def _remember_subfolders(folder_ids: Sequence[str]) -> None:
+    """変更フィードで見つけた新しいサブフォルダをキャッシュ済みのツリーに追加"""
+    tree = _load_folder_tree()
+    if tree.get("roots") != DRIVE_FOLDER_IDS:
+        return
+    tree["folders"] = list(dict.fromkeys(list(tree.get("folders", [])) + list(folder_ids)))
+    _save_folder_tree(tree)
+
+
+def load_changes_state() -> Dict[str, str]:
+    """保存済みの changes.list の状態（page_token / since / last_run）を読む。無ければ空"""
+    try:
+        with open(DRIVE_CHANGES_STATE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_changes_state(state: Dict[str, str]) -> None:
+    """状態を書き込む（途中で落ちても壊れないよう置き換えで保存）"""
+    directory = os.path.dirname(DRIVE_CHANGES_STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{DRIVE_CHANGES_STATE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, DRIVE_CHANGES_STATE_PATH)
+
+
+def get_start_page_token() -> str:
+    """現在以降の変更を読むためのページトークン"""
+    result = drive().changes().getStartPageToken(supportsAllDrives=True).execute()
+    return result["startPageToken"]
+
+
+def list_changed_docs(folder_ids: Sequence[str], page_token: str, since: str = "") -> Tuple[List[Dict[str, str]], str]:
+    """
+    page_token 以降に変更されたファイルのうち、folder_ids 直下のGoogle Docs（ゴミ箱以外）を返す
+    since 指定時はそれより前に作成されたDocs（既存Docsの編集など）を除く
+    DRIVE_RECURSIVE 指定時は、監視フォルダ内に新しく作られたサブフォルダも監視対象に加える
+    戻り値: (Docsのリスト（作成日時の新しい順）, 次回用のページトークン)
+    """
+    drive_service = drive()
+    folders = set(folder_ids)
+    new_folders: List[str] = []
+    found: Dict[str, Dict[str, str]] = {}
+    scanned = 0
+    while True:
+        results = drive_service.changes().list(
+            pageToken=page_token,
+            fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({CHANGE_FILE_FIELDS}))",
+            pageSize=1000,
+            includeRemoved=False,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True,
+        ).execute()
+        for change in results.get("changes", []):
+            scanned += 1
+            f = change.get("file") or {}
+            if change.get("removed") or not f or f.get("trashed"):
+                continue
+            parents = f.get("parents") or []
+            if not any(p in folders for p in parents):
+                continue
+            if DRIVE_RECURSIVE and f.get("mimeType") == FOLDER_MIME_TYPE and f["id"] not in folders:
+                # 変更は時刻順に並ぶため、以降の変更でこのフォルダ内のDocsも拾える
+                folders.add(f["id"])
+                new_folders.append(f["id"])
+                continue
+            if f.get("mimeType") != DOC_MIME_TYPE:
+                continue
+            if since and f.get("createdTime", "") <= since:
+                continue
+            # 同じファイルの変更が複数回含まれることがあるため最新で上書き
+            found[f["id"]] = f
+        if results.get("newStartPageToken"):
+            page_token = results["newStartPageToken"]
+            break
+        page_token = results["nextPageToken"]
+
+    if new_folders:
+        _remember_subfolders(new_folders)
+        print(f"[drive_monitor] Found {len(new_folders)} new subfolder(s)")
+    docs_found = sorted(found.values(), key=lambda f: f.get("createdTime", ""), reverse=True)
+    print(f"[drive_monitor] Scanned {scanned} changes, found {len(docs_found)} new docs in {len(folders)} folder(s)")
+    return docs_found, page_token
+
+
 def _lookup_calendar_event_and_attendees(keyword: str, target_date_str: str) -> (Optional[str], List[str]):
     """同日のカレンダーから対象イベントを特定し、開始日時（ISO文字列）と出席者メールを返す。
     - keyword がタイトルに含まれるイベントを優先
@@ -163,152 +406,369 @@ def _lookup_calendar_event_and_attendees(keyword: str, target_date_str: str) ->
         return None, []
 
 
-def doc_already_exists(sheet_name: str, doc_url: str) -> bool:
-    """シート内に既に同じdoc_urlが存在するかチェック"""
-    rows = read_sheet_rows(sheet_name)
-    for row in rows:
-        if row.get("doc_url") == doc_url:
-            return True
-    return False
+class DocIndex:
+    """
+    実行中に使う既存行の索引
+    - doc_id -> (シート名, 行番号)（追加待ちの行は行番号 None。アーカイブ済みの行はアーカイブシートの位置）
+    - シート名 -> 既存行の channel_id（シートごとに固定）
+    """
+
+    def __init__(self, sheet_names: List[str]) -> None:
+        self.sheet_names = sheet_names
+        self.locations: Dict[str, Tuple[str, Optional[int]]] = {}
+        self.channels: Dict[str, str] = {}
+
+    @classmethod
+    def build(cls) -> "DocIndex":
+        """
+        事業部シートの doc_url / channel_id 列だけをまとめて読み込んで索引を作る
+        アーカイブシートへ移動済みの Docs を再び追加しないよう、アーカイブシートの doc_url も索引に含める
+        全行がアーカイブ済みのシートは、アーカイブシートの channel_id を既定のチャンネルとする
+        """
+        snapshot = load_snapshot(columns=INDEX_COLUMNS)
+        index = cls(snapshot.sheet_names())
+        for sheet_name, rows in snapshot:
+            for row in rows:
+                doc_id = doc_id_from_url(row.get("doc_url", ""))
+                if doc_id:
+                    index.locations.setdefault(doc_id, (sheet_name, row.get("_row_number")))
+                channel_id = row.get("channel_id", "").strip()
+                if channel_id and sheet_name not in index.channels:
+                    index.channels[sheet_name] = channel_id
+        archived = 0
+        live_names = {archive_sheet_name(name): name for name in index.sheet_names}
+        for sheet_name, rows in load_archive_snapshot(INDEX_COLUMNS):
+            live_name = live_names.get(sheet_name)
+            for row in rows:
+                doc_id = doc_id_from_url(row.get("doc_url", ""))
+                if doc_id and doc_id not in index.locations:
+                    index.locations[doc_id] = (sheet_name, row.get("_row_number"))
+                    archived += 1
+                channel_id = row.get("channel_id", "").strip()
+                if live_name and channel_id and live_name not in index.channels:
+                    index.channels[live_name] = channel_id
+        print(f"[drive_monitor] Indexed {len(index.locations)} docs in {len(index.sheet_names)} sheets ({archived} archived)")
+        return index
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.locations
+
+    def location(self, doc_id: str) -> Optional[Tuple[str, Optional[int]]]:
+        return self.locations.get(doc_id)
+
+    def add(self, doc_id: str, sheet_name: str, row_number: Optional[int] = None) -> None:
+        self.locations[doc_id] = (sheet_name, row_number)
+
+    def default_channel(self, sheet_name: str) -> str:
+        return self.channels.get(sheet_name, "")
 
 
 def monitor_and_update_sheets():
     """Drive監視メイン処理"""
-    if not DRIVE_FOLDER_ID:
-        print("[drive_monitor] ERROR: DRIVE_FOLDER_ID not set or empty. Skipping.")
+    if not DRIVE_FOLDER_IDS:
+        print("[drive_monitor] ERROR: DRIVE_FOLDER_ID / DRIVE_FOLDER_IDS not set or empty. Skipping.")
         print(f"[drive_monitor] DEBUG: DRIVE_FOLDER_ID value: '{DRIVE_FOLDER_ID}' (length: {len(DRIVE_FOLDER_ID)})")
         return
     
-    print(f"[drive_monitor] Monitoring folder: {DRIVE_FOLDER_ID}")
+    print(f"[drive_monitor] Monitoring folders: {', '.join(DRIVE_FOLDER_IDS)}" + (" (recursive)" if DRIVE_RECURSIVE else ""))
     if DEFAULT_TARGET_SHEET:
         print(f"[drive_monitor] DEFAULT_TARGET_SHEET: {DEFAULT_TARGET_SHEET}")
     
-    # 直近の新規Docsを取得（環境変数 DRIVE_LOOKBACK_HOURS で調整可能）
-    new_docs = list_docs_in_folder(DRIVE_FOLDER_ID, hours_ago=LOOKBACK_HOURS)
-    
+    folders = get_monitored_folders()
+    if DRIVE_MONITOR_MODE == "lookback":
+        # 直近の新規Docsを取得（環境変数 DRIVE_LOOKBACK_HOURS で調整可能）
+        ingest_docs(list_docs_in_folders(folders, hours_ago=LOOKBACK_HOURS))
+        return
+
+    # 今回の実行の開始時刻（トークンを取り直すときは、前回の開始時刻以降に作成されたDocsを検索する）
+    started = _cutoff_str(0)
+    state = load_changes_state()
+    new_docs: Optional[List[Dict[str, str]]] = None
+    next_token = ""
+    if state.get("page_token"):
+        try:
+            new_docs, next_token = list_changed_docs(folders, state["page_token"], state.get("since", ""))
+        except Exception as e:
+            # トークンの失効・不正のときだけ取り直す。一時的なエラーはトークンを残したまま失敗させ、次回読み直す
+            if http_status(e) not in INVALID_PAGE_TOKEN_STATUSES:
+                raise
+            print(f"[drive_monitor] Saved page token is no longer valid ({e}); re-initializing")
+    if new_docs is None:
+        # 先にトークンを取ってから検索し、その間の変更を取りこぼさない
+        next_token = get_start_page_token()
+        resume_from = state.get("last_run") or state.get("since") or ""
+        state["since"] = state.get("since") or _cutoff_str(LOOKBACK_HOURS)
+        if resume_from:
+            # 取り直し: 前回の実行以降に作成されたDocsを検索（取り込み済みのDocsは索引で除かれる）
+            print(f"[drive_monitor] Re-bootstrapping from {resume_from}")
+            new_docs = list_docs_in_folders(folders, created_after=resume_from)
+        else:
+            print(f"[drive_monitor] No saved page token; bootstrapping with lookback of {LOOKBACK_HOURS}h")
+            new_docs = list_docs_in_folders(folders, hours_ago=LOOKBACK_HOURS)
+
+    # シートへの追加が成功してからトークンを進める（失敗時は次回同じ変更を読み直す）
+    ingest_docs(new_docs)
+    state["page_token"] = next_token
+    state["last_run"] = started
+    state["updated_at"] = now_jst_str()
+    save_changes_state(state)
+
+
+def match_target_sheet(title: str, sheet_names: List[str]) -> Optional[str]:
+    """
+    タイトルにシート名が含まれるかチェックして振り分け先を決める
+    例：「AI基盤MTG」→「AI基盤」シート、「BI基盤MTG」→「BI基盤」シート
+    """
+    for sheet_name in sheet_names:
+        if sheet_name in title:
+            print(f"[drive_monitor] Matched sheet '{sheet_name}' from title: {title}")
+            return sheet_name
+    if DEFAULT_TARGET_SHEET and DEFAULT_TARGET_SHEET in sheet_names:
+        print(f"[drive_monitor] No matching sheet. Falling back to DEFAULT_TARGET_SHEET='{DEFAULT_TARGET_SHEET}'")
+        return DEFAULT_TARGET_SHEET
+    print(f"[drive_monitor] No matching sheet found for title: {title} (skipping)")
+    return None
+
+
+def build_doc_row(doc_file: Dict[str, str], default_channel_id: str, summary: Optional[str] = None) -> Dict[str, str]:
+    """
+    Docsの本文とカレンダーの予定から、シートに追加する行データを作る
+    summary を渡した場合（prefetch_doc_texts で取得済み）は本文を取得しない
+    """
+    doc_id = doc_file["id"]
+    doc_url = doc_file.get("webViewLink", f"https://docs.google.com/document/d/{doc_id}/edit")
+    title = doc_file.get("name", "無題")
+    created_time = doc_file.get("createdTime", "")
+
+    # 作成日の初期値
+    try:
+        created_dt = datetime.fromisoformat(created_time.replace("Z", "+00:00"))
+        date_str = created_dt.strftime("%Y-%m-%d")
+    except Exception:
+        date_str = now_jst_str()[:10]
+
+    # Docsの本文を取得（更新されていなければキャッシュから）
+    if summary is None:
+        summary = get_doc_text_content(doc_id, doc_file.get("modifiedTime", ""))
+
+    # カレンダーから当日イベントを照会して、正確な日付と参加者を補完
+    # 例: タイトルに「AI基盤」などのキーワードが含まれていれば、そのイベントを優先
+    event_start_iso, attendees = _lookup_calendar_event_and_attendees(title, date_str)
+    date_display = ""
+    if event_start_iso:
+        # date列は時刻付きISOに（下流で日付だけ必要な箇所はスライスして使用）
+        date_str = event_start_iso
+        try:
+            dt = datetime.fromisoformat(event_start_iso.replace("Z", "+00:00"))
+            dow = "月火水木金土日"[dt.weekday()]
+            date_display = f"{dt.month}月{dt.day}日（{dow}）{dt.strftime('%H:%M')}~{(dt + timedelta(hours=1)).strftime('%H:%M')}"
+        except Exception:
+            date_display = ""
+
+    # next_meeting_date = date + 7日（ベースは日付部）
+    next_meeting_date = date_plus_days(date_str[:10], 7)
+    # 表示用の next_meeting_date_display（開始+7日，同じ時刻帯を仮適用）
+    next_display = ""
+    try:
+        dt0 = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        dt1 = dt0 + timedelta(days=7)
+        dow1 = "月火水木金土日"[dt1.weekday()]
+        next_display = f"{dt1.month}月{dt1.day}日（{dow1}）{dt1.strftime('%H:%M')}~{(dt1 + timedelta(hours=1)).strftime('%H:%M')}"
+    except Exception:
+        next_display = ""
+
+    # 新規行データ（大きな本文は退避してポインタを書く）
+    return offload_row({
+        "doc_url": doc_url,
+        "summary": summary,
+        "title": title,
+        "date": date_str,
+        "date_display": date_display,
+        "next_meeting_date": next_meeting_date,
+        "next_meeting_date_display": next_display,
+        "updated_at": now_jst_str(),
+        "formatted_minutes": "",
+        "decisions": "",
+        "open_issues": "",
+        "hearing_responses01": "",
+        "hearing_responses02": "",
+        "hearing_responses03": "",
+        "hearing_responses04": "",
+        "next_agenda": "",
+        "status": "new",
+        "remarks": "",
+        "meeting_key": "",
+        "channel_id": default_channel_id,  # 既存行から自動コピー
+        "participants": ", ".join(attendees) if attendees else "",
+        "minutes_thread_ts": "",
+        "final_minutes_thread_ts": "",
+        "hearing_thread_ts": "",
+        "minutes_posted": "",
+    })
+
+
+def append_pending(pending: Dict[str, List[Dict[str, str]]]) -> int:
+    """シートごとにまとめた行を、1シート1回の values.append で書き込む"""
+    if not pending:
+        return 0
+    # ヘッダーは対象シート分をまとめて1回だけ取得
+    prefetch_headers(list(pending))
+    total = 0
+    for target_sheet, rows in pending.items():
+        added = append_rows(target_sheet, rows)
+        print(f"[drive_monitor] Added {added} new doc(s) to {target_sheet}")
+        total += added
+    return total
+
+
+def ingest_docs(new_docs: List[Dict[str, str]]) -> None:
+    """新規Docsをシートに振り分けて追加"""
     if not new_docs:
         print("[drive_monitor] No new documents found.")
         return
     
-    # 全シート名を取得
-    sheet_names = get_all_sheet_names()
+    # 既存行の索引（各シートを1回だけ読む）
+    index = DocIndex.build()
+    sheet_names = index.sheet_names
     print(f"[drive_monitor] Found {len(sheet_names)} sheets: {sheet_names}")
     
+    # 追加する行はシートごとにまとめ、最後に1シート1回の values.append で書き込む
+    pending: Dict[str, List[Dict[str, str]]] = {}
+    queued: List[Tuple[Dict[str, str], str]] = []
+
     # 各新規Docsに対して処理
     for doc_file in new_docs:
         doc_id = doc_file["id"]
-        doc_url = doc_file.get("webViewLink", f"https://docs.google.com/document/d/{doc_id}/edit")
         title = doc_file.get("name", "無題")
-        created_time = doc_file.get("createdTime", "")
-        
-        # 作成日の初期値
-        try:
-            created_dt = datetime.fromisoformat(created_time.replace("Z", "+00:00"))
-            date_str = created_dt.strftime("%Y-%m-%d")
-        except Exception:
-            date_str = now_jst_str()[:10]
-        
-        print(f"[drive_monitor] Processing: {title} ({doc_url})")
-        
-        # Docsの本文を取得
-        summary = get_doc_text_content(doc_id)
-
-        # カレンダーから当日イベントを照会して、正確な日付と参加者を補完
-        # 例: タイトルに「AI基盤」などのキーワードが含まれていれば、そのイベントを優先
-        event_start_iso, attendees = _lookup_calendar_event_and_attendees(title, date_str)
-        date_display = ""
-        if event_start_iso:
-            # date列は時刻付きISOに（下流で日付だけ必要な箇所はスライスして使用）
-            date_str = event_start_iso
-            try:
-                dt = datetime.fromisoformat(event_start_iso.replace("Z", "+00:00"))
-                dow = "月火水木金土日"[dt.weekday()]
-                date_display = f"{dt.month}月{dt.day}日（{dow}）{dt.strftime('%H:%M')}~{(dt + timedelta(hours=1)).strftime('%H:%M')}"
-            except Exception:
-                date_display = ""
-        
-        # next_meeting_date = date + 7日（ベースは日付部）
-        next_meeting_date = date_plus_days(date_str[:10], 7)
-        # 表示用の next_meeting_date_display（開始+7日，同じ時刻帯を仮適用）
-        next_display = ""
-        try:
-            dt0 = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            dt1 = dt0 + timedelta(days=7)
-            dow1 = "月火水木金土日"[dt1.weekday()]
-            next_display = f"{dt1.month}月{dt1.day}日（{dow1}）{dt1.strftime('%H:%M')}~{(dt1 + timedelta(hours=1)).strftime('%H:%M')}"
-        except Exception:
-            next_display = ""
-        
-        # タイトルにシート名が含まれるかチェックして振り分け
-        # 例：「AI基盤MTG」→「AI基盤」シート、「BI基盤MTG」→「BI基盤」シート
-        target_sheet = None
-        for sheet_name in sheet_names:
-            # システムシート以外を対象
-            if sheet_name.lower() in ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]:
-                continue
-            
-            # タイトルにシート名が含まれているかチェック
-            if sheet_name in title:
-                target_sheet = sheet_name
-                print(f"[drive_monitor] Matched sheet '{sheet_name}' from title: {title}")
-                break
+        print(f"[drive_monitor] Processing: {title} ({doc_id})")
         
+        # 重複チェック（今回の実行で追加予定の行も含む。Drive のファイルIDで判定）
+        # 本文の取得より先に行い、既存のDocsにはAPIを呼ばない
+        existing = index.location(doc_id)
+        if existing:
+            print(f"[drive_monitor] Doc already exists in {existing[0]}: {doc_id}")
+            continue
+
+        target_sheet = match_target_sheet(title, sheet_names)
         if not target_sheet:
-            if DEFAULT_TARGET_SHEET and DEFAULT_TARGET_SHEET in sheet_names:
-                target_sheet = DEFAULT_TARGET_SHEET
-                print(f"[drive_monitor] No matching sheet. Falling back to DEFAULT_TARGET_SHEET='{DEFAULT_TARGET_SHEET}'")
-            else:
-                print(f"[drive_monitor] No matching sheet found for title: {title} (skipping)")
-                continue
-        
-        # 重複チェック
-        if doc_already_exists(target_sheet, doc_url):
-            print(f"[drive_monitor] Doc already exists in {target_sheet}: {doc_url}")
             continue
-        
+        index.add(doc_id, target_sheet)
+        queued.append((doc_file, target_sheet))
+
+    # 追加対象の本文はまとめて取得（バッチリクエスト）
+    texts = prefetch_doc_texts([doc_file for doc_file, _ in queued])
+    for doc_file, target_sheet in queued:
         # 既存行からchannel_idを取得（シートごとに固定）
-        existing_rows = read_sheet_rows(target_sheet)
-        default_channel_id = ""
-        for existing_row in existing_rows:
-            existing_channel = existing_row.get("channel_id", "").strip()
-            if existing_channel:
-                default_channel_id = existing_channel
-                break
-        
-        # 新規行データ
-        new_row = {
-            "doc_url": doc_url,
-            "summary": summary,
-            "title": title,
-            "date": date_str,
-            "date_display": date_display,
-            "next_meeting_date": next_meeting_date,
-            "next_meeting_date_display": next_display,
-            "updated_at": now_jst_str(),
-            "formatted_minutes": "",
-            "decisions": "",
-            "open_issues": "",
-            "hearing_responses01": "",
-            "hearing_responses02": "",
-            "hearing_responses03": "",
-            "hearing_responses04": "",
-            "next_agenda": "",
-            "status": "new",
-            "remarks": "",
-            "meeting_key": "",
-            "channel_id": default_channel_id,  # 既存行から自動コピー
-            "participants": ", ".join(attendees) if attendees else "",
-            "minutes_thread_ts": "",
-            "final_minutes_thread_ts": "",
-            "hearing_thread_ts": "",
-            "minutes_posted": "",
-        }
-        
-        # シートに追加
-        append_row(target_sheet, new_row)
-        print(f"[drive_monitor] Added new doc to {target_sheet}: {title}")
+        new_row = build_doc_row(doc_file, index.default_channel(target_sheet), texts.get(doc_file["id"]))
+        pending.setdefault(target_sheet, []).append(new_row)
+        print(f"[drive_monitor] Queued new doc for {target_sheet}: {doc_file.get('name', '無題')}")
+
+    append_pending(pending)
+
+
+def load_backfill_state(since: str) -> Dict[str, Any]:
+    """バックフィルのチェックポイントを読む（since が違えば新規に始める）"""
+    try:
+        with open(BACKFILL_STATE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {}
+    if not isinstance(state, dict) or state.get("since") != since:
+        state = {"since": since, "done": [], "appended": 0}
+    return state
+
+
+def save_backfill_state(state: Dict[str, Any]) -> None:
+    directory = os.path.dirname(BACKFILL_STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{BACKFILL_STATE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, BACKFILL_STATE_PATH)
+
+
+def backfill(since: str, workers: int = 0, batch_size: int = 0) -> int:
+    """
+    since（YYYY-MM-DD, JST）以降に作成されたフォルダ内の全Docsを取り込む
+    - 本文は batch_size 件ごとにバッチリクエストで取得し、カレンダーの照会はスレッドプールで並列実行
+    - batch_size 件ごとにシートへ追加し、処理済みのファイルIDをチェックポイントに保存
+      （中断しても再実行すれば続きから再開する）
+    戻り値: 今回追加した行数
+    """
+    import pytz
+    workers = workers or BACKFILL_WORKERS
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    tz_info = pytz.timezone(DEFAULT_TIMEZONE)
+    since_dt = tz_info.localize(datetime.strptime(since, "%Y-%m-%d"))
+    since_rfc = since_dt.astimezone(pytz.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+    state = load_backfill_state(since)
+    done = set(state["done"])
+    print(f"[drive_monitor] Backfill since {since} ({since_rfc}), {len(done)} docs already checkpointed")
+
+    docs_found = list_docs_in_folders(get_monitored_folders(refresh=True), created_after=since_rfc)
+    docs_found.sort(key=lambda f: f.get("createdTime", ""))
+
+    index = DocIndex.build()
+    todo: List[Tuple[Dict[str, str], str]] = []
+    for doc_file in docs_found:
+        doc_id = doc_file["id"]
+        if doc_id in done or doc_id in index:
+            continue
+        target_sheet = match_target_sheet(doc_file.get("name", "無題"), index.sheet_names)
+        if not target_sheet:
+            done.add(doc_id)
+            continue
+        index.add(doc_id, target_sheet)
+        todo.append((doc_file, target_sheet))
+    print(f"[drive_monitor] Backfill: {len(todo)} docs to ingest with {workers} workers")
+
+    added = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            # 本文はバッチリクエストでまとめて取得し、カレンダーの照会だけを並列に行う
+            texts = prefetch_doc_texts([doc_file for doc_file, _ in batch])
+            rows = list(pool.map(
+                lambda item: build_doc_row(item[0], index.default_channel(item[1]), texts.get(item[0]["id"])),
+                batch,
+            ))
+            pending: Dict[str, List[Dict[str, str]]] = {}
+            for (doc_file, target_sheet), row in zip(batch, rows):
+                pending.setdefault(target_sheet, []).append(row)
+            added += append_pending(pending)
+            # 追加が済んだ分だけチェックポイントを進める
+            done.update(doc_file["id"] for doc_file, _ in batch)
+            state["done"] = sorted(done)
+            state["appended"] = state.get("appended", 0) + len(batch)
+            state["updated_at"] = now_jst_str()
+            save_backfill_state(state)
+            print(f"[drive_monitor] Backfill progress: {min(start + batch_size, len(todo))}/{len(todo)}")
+
+    print(f"[drive_monitor] Backfill finished: added {added} rows")
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Drive監視（新規Docsをシートに追加）")
+    parser.add_argument("--backfill", action="store_true", help="過去のDocsをまとめて取り込む")
+    parser.add_argument("--since", help="バックフィルの開始日（YYYY-MM-DD）")
+    parser.add_argument("--workers", type=int, default=0, help=f"並列数（既定: {BACKFILL_WORKERS}）")
+    parser.add_argument("--batch-size", type=int, default=0, help=f"1回に追加する行数（既定: {BACKFILL_BATCH_SIZE}）")
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        monitor_and_update_sheets()
+        return
+    if not DRIVE_FOLDER_IDS:
+        print("[drive_monitor] ERROR: DRIVE_FOLDER_ID / DRIVE_FOLDER_IDS not set or empty. Skipping.")
+        return
+    if not args.since:
+        parser.error("--backfill requires --since YYYY-MM-DD")
+    backfill(args.since, workers=args.workers, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
-    monitor_and_update_sheets()
+    main()
 
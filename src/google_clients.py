@@ -1,24 +1,145 @@
+import json
 import os
+import pickle
+import threading
 from functools import lru_cache
-from googleapiclient.discovery import build
-from .auth import get_google_credentials
+from typing import Any, List, Optional, Sequence, Tuple
+
+# googleapiclient / google-auth は重いため、クライアントを最初に使うときまで読み込まない
+
+# ライブラリ同梱の discovery 文書を解析した結果を pickle で保存する場所（空なら毎回解析）
+DISCOVERY_CACHE_DIR = os.getenv("GOOGLE_DISCOVERY_CACHE_DIR", ".cache/discovery").strip()
+
+# バッチリクエスト1回にまとめる件数の上限（Calendar API の上限 50 に合わせる。Drive/Docs は 100 まで可）
+GOOGLE_BATCH_MAX_SIZE = int(os.getenv("GOOGLE_BATCH_MAX_SIZE", "50") or "50")
+
+# クライアントは全スレッドで共有する（通信は session() のコネクションプールを使うためスレッドセーフ）
+_lock = threading.Lock()
+_services = {}
+
 
 @lru_cache(maxsize=1)
-def sheets():
-    creds = get_google_credentials()
-    return build("sheets", "v4", credentials=creds)
+def credentials():
+    from .auth import get_google_credentials
+    return get_google_credentials()
+
 
 @lru_cache(maxsize=1)
+def session():
+    """全APIで共有する認証付きセッション（keep-alive のコネクションプール）"""
+    from .http_transport import build_session
+    return build_session(credentials())
+
+
+@lru_cache(maxsize=None)
+def _discovery_document(name: str, version: str):
+    """
+    API の discovery 文書を dict で返す（ネットワークは使わない。同梱されていなければ None）
+    解析結果はライブラリのバージョンごとに pickle で保存し、次回以降は JSON を解析しない
+    """
+    from googleapiclient.version import __version__ as lib_version
+    path = os.path.join(DISCOVERY_CACHE_DIR, f"{name}.{version}.{lib_version}.pickle") if DISCOVERY_CACHE_DIR else ""
+    if path:
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    from googleapiclient.discovery_cache import get_static_doc
+    content = get_static_doc(name, version)
+    if not content:
+        return None
+    document = json.loads(content)
+    if path:
+        try:
+            os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(document, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[google_clients] Could not save discovery cache {path}: {e}")
+    return document
+
+
+def _request_builder(http, *args, methodId=None, **kwargs):
+    """HttpRequest を作る際に、送信に使う http へ API メソッド名（ETag キャッシュの集計用）を付ける"""
+    from googleapiclient.http import HttpRequest
+    if methodId and hasattr(http, "for_method"):
+        http = http.for_method(methodId)
+    return HttpRequest(http, *args, methodId=methodId, **kwargs)
+
+
+def _service(name: str, version: str):
+    svc = _services.get(name)
+    if svc is not None:
+        return svc
+    with _lock:
+        svc = _services.get(name)
+        if svc is None:
+            from googleapiclient.discovery import build, build_from_document
+            from .http_transport import SessionHttp, get_etag_cache
+            http = SessionHttp(session(), etag_cache=get_etag_cache())
+            document = _discovery_document(name, version)
+            if document is not None:
+                svc = build_from_document(document, http=http, requestBuilder=_request_builder)
+            else:
+                svc = build(name, version, http=http, requestBuilder=_request_builder)
+            _services[name] = svc
+    return svc
+
+
+def sheets():
+    return _service("sheets", "v4")
+
 def drive():
-    creds = get_google_credentials()
-    return build("drive", "v3", credentials=creds)
+    return _service("drive", "v3")
 
-@lru_cache(maxsize=1)
 def docs():
-    creds = get_google_credentials()
-    return build("docs", "v1", credentials=creds)
+    return _service("docs", "v1")
 
-@lru_cache(maxsize=1)
 def calendar():
-    creds = get_google_credentials()
-    return build("calendar", "v3", credentials=creds)
+    return _service("calendar", "v3")
+
+
+def batch_execute(service: Any, requests: Sequence[Any], max_size: int = 0) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    service（sheets() / drive() / docs() / calendar()）で作った HttpRequest（execute() 前のもの）を
+    multipart のバッチリクエストでまとめて実行する
+    max_size 件ごとに1回の HTTP リクエストになる
+    戻り値: requests と同じ順序の (レスポンス, 例外) のリスト。失敗した項目はレスポンスが None
+    バッチ自体が失敗した場合は、その分を1件ずつ execute() して結果を埋める
+    """
+    results: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(requests)
+    if not requests:
+        return results
+    max_size = max(1, min(max_size or GOOGLE_BATCH_MAX_SIZE, 1000))
+
+    def callback(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+        results[int(request_id)] = (response, exception)
+
+    for start in range(0, len(requests), max_size):
+        chunk = range(start, min(start + max_size, len(requests)))
+        batch = service.new_batch_http_request(callback=callback)
+        for i in chunk:
+            batch.add(requests[i], request_id=str(i))
+        try:
+            # 各リクエストと同じ共有セッションで送る（認証ヘッダーは中の各リクエストにも付く）
+            batch.execute()
+        except Exception as e:
+            print(f"[google_clients] Batch request failed ({e}); executing {len(chunk)} request(s) one by one")
+            for i in chunk:
+                try:
+                    results[i] = (requests[i].execute(), None)
+                except Exception as item_error:
+                    results[i] = (None, item_error)
+    return results
+
+
+def http_status(e: Exception) -> Optional[int]:
+    """googleapiclient の HttpError から HTTP ステータスを取り出す（それ以外の例外は None）"""
+    status = getattr(getattr(e, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,221 @@
+"""
+Google API クライアント用の HTTP トランスポート
+googleapiclient が使う httplib2.Http 互換の request() を、AuthorizedSession（requests）の
+コネクションプール上で実装する。keep-alive で TLS 接続を使い回し、複数スレッドから同時に使える
+GET のレスポンスは ETag と本文を保存し、次回は If-None-Match で問い合わせる（304 なら保存済みの本文を返す）
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httplib2
+
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "10") or "10")
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "120") or "120")
+# ETag キャッシュ: メモリに保持する件数（0 で無効）と、実行をまたいで保持する SQLite のパス（空ならメモリのみ）
+GOOGLE_ETAG_CACHE_SIZE = int(os.getenv("GOOGLE_ETAG_CACHE_SIZE", "256") or "0")
+GOOGLE_ETAG_CACHE_PATH = os.getenv("GOOGLE_ETAG_CACHE_PATH", ".cache/google_etag_cache.sqlite3").strip()
+GOOGLE_ETAG_CACHE_MAX_ENTRIES = int(os.getenv("GOOGLE_ETAG_CACHE_MAX_ENTRIES", "5000") or "0")
+
+# requests 側で展開済みのため、httplib2 互換のレスポンスからは外すヘッダー
+_DROP_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def build_session(credentials, pool_size: int = GOOGLE_HTTP_POOL_SIZE):
+    """認証付きで、ホストごとに pool_size 本まで接続を保持するセッション"""
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_ETAG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    uri TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class ETagCache:
+    """
+    GET の URI ごとに (ETag, ヘッダー, 本文) を保持するキャッシュ
+    メモリ上は LRU で max_entries 件、path を指定すると SQLite にも保存して次回の実行で使う
+    API メソッド（calendar.events.list など）ごとの問い合わせ数・304 の数を集計する
+    """
+
+    def __init__(self, max_entries: int = GOOGLE_ETAG_CACHE_SIZE, path: str = GOOGLE_ETAG_CACHE_PATH,
+                 max_disk_entries: int = GOOGLE_ETAG_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, Dict[str, str], bytes]]" = OrderedDict()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.conn = None
+        if path:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.conn = sqlite3.connect(path, check_same_thread=False)
+                self.conn.executescript(_ETAG_SCHEMA)
+            except sqlite3.Error as e:
+                print(f"[http_transport] ETag cache disabled on disk ({path}): {e}")
+                self.conn = None
+
+    def get(self, uri: str) -> Optional[Tuple[str, Dict[str, str], bytes]]:
+        with self._lock:
+            entry = self._memory.get(uri)
+            if entry is not None:
+                self._memory.move_to_end(uri)
+                return entry
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT etag, headers, body FROM responses WHERE uri = ?", (uri,)).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], json.loads(row[1]), bytes(row[2]))
+            self._remember(uri, entry)
+            return entry
+
+    def put(self, uri: str, etag: str, headers: Dict[str, str], body: bytes) -> None:
+        entry = (etag, headers, body)
+        with self._lock:
+            self._remember(uri, entry)
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (uri, etag, headers, body, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (uri, etag, json.dumps(headers), body, time.time()),
+                )
+                if self.max_disk_entries:
+                    self.conn.execute(
+                        "DELETE FROM responses WHERE uri NOT IN (SELECT uri FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                        (self.max_disk_entries,),
+                    )
+
+    def touch(self, uri: str) -> None:
+        """304 で使った項目の最終利用時刻を更新（ディスク上の削除順に使う）"""
+        if self.conn is None:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE uri = ?", (time.time(), uri))
+
+    def _remember(self, uri: str, entry: Tuple[str, Dict[str, str], bytes]) -> None:
+        self._memory[uri] = entry
+        self._memory.move_to_end(uri)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def count(self, method_id: str, outcome: str) -> None:
+        """outcome: hit（304）/ miss（200 で保存）/ uncacheable（ETag なし・エラー）"""
+        with self._lock:
+            counts = self.stats.setdefault(method_id, {"hit": 0, "miss": 0, "uncacheable": 0})
+            counts[outcome] += 1
+
+    def report(self) -> None:
+        """API メソッドごとのヒット率を出力"""
+        for method_id, counts in sorted(self.stats.items()):
+            total = sum(counts.values())
+            rate = counts["hit"] / total * 100 if total else 0.0
+            print(
+                f"[http_transport] ETag cache {method_id}: {counts['hit']}/{total} hits ({rate:.0f}%), "
+                f"{counts['miss']} stored, {counts['uncacheable']} uncacheable"
+            )
+
+
+_ETAG_CACHE: Optional[ETagCache] = None
+_ETAG_CACHE_LOCK = threading.Lock()
+
+
+def get_etag_cache() -> Optional[ETagCache]:
+    """GOOGLE_ETAG_CACHE_SIZE が 0 なら None。初回作成時に終了時のヒット率出力を登録する"""
+    global _ETAG_CACHE
+    if GOOGLE_ETAG_CACHE_SIZE <= 0:
+        return None
+    with _ETAG_CACHE_LOCK:
+        if _ETAG_CACHE is None:
+            _ETAG_CACHE = ETagCache()
+            atexit.register(_ETAG_CACHE.report)
+    return _ETAG_CACHE
+
+
+class SessionHttp:
+    """httplib2.Http の代わりに googleapiclient の build(..., http=...) に渡すアダプタ"""
+
+    def __init__(self, session, timeout: float = GOOGLE_HTTP_TIMEOUT, etag_cache: Optional[ETagCache] = None,
+                 method_id: str = "") -> None:
+        self.session = session
+        self.timeout = timeout
+        # googleapiclient の一部（バッチなど）が http.credentials を参照する
+        self.credentials = session.credentials
+        self.etag_cache = etag_cache
+        # 集計に使う API メソッド名（for_method で付ける）
+        self.method_id = method_id
+
+    def for_method(self, method_id: str) -> "SessionHttp":
+        """同じセッション・キャッシュを使い、集計上の API メソッド名だけを変えたもの"""
+        return SessionHttp(self.session, self.timeout, self.etag_cache, method_id)
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        redirections: int = 5,
+        connection_type=None,
+    ) -> Tuple["httplib2.Response", bytes]:
+        import httplib2
+
+        cache = self.etag_cache if method == "GET" else None
+        cached = cache.get(uri) if cache is not None else None
+        if cached is not None:
+            headers = dict(headers or {})
+            headers["if-none-match"] = cached[0]
+        resp = self.session.request(
+            method,
+            uri,
+            data=body,
+            headers=headers,
+            timeout=self.timeout,
+            allow_redirects=redirections > 0,
+        )
+        label = self.method_id or "unknown"
+        if cached is not None and resp.status_code == 304:
+            # 変更なし: 保存済みの 200 レスポンスを返す
+            cache.touch(uri)
+            cache.count(label, "hit")
+            response = httplib2.Response(dict(cached[1], status="200"))
+            response.reason = "OK"
+            return response, cached[2]
+        info = {k.lower(): v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        if cache is not None:
+            etag = info.get("etag")
+            if resp.status_code == 200 and etag:
+                cache.put(uri, etag, info, resp.content)
+                cache.count(label, "miss")
+            else:
+                cache.count(label, "uncacheable")
+        info["status"] = str(resp.status_code)
+        response = httplib2.Response(info)
+        response.reason = resp.reason
+        return response, resp.content
+
+    def close(self) -> None:
+        self.session.close()
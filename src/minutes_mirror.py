@@ -0,0 +1,163 @@
+"""
+議事録スプレッドシートのローカルミラー（SQLite）
+シートごと・行ごとの値を保持し、minutes_repo の読み込みをローカルで返すために使う
+同期の判定（Drive の modifiedTime / 行ごとの値の比較）は minutes_repo 側で行う
+"""
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MINUTES_MIRROR_PATH = os.getenv("MINUTES_MIRROR_PATH", "").strip()
+
+# スキーマを変えたら上げる（古いミラーは作り直して次回の同期で全体を取得する）
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    headers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    sheet TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    cells TEXT NOT NULL,
+    PRIMARY KEY (sheet, row_number)
+);
+"""
+
+
+class MinutesMirror:
+    """スプレッドシートの値を (シート, 行番号) 単位で保持するSQLiteミラー"""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS sheets; DROP TABLE IF EXISTS rows;")
+            self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- メタ情報 ---
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def modified_time(self) -> Optional[str]:
+        """最後に同期したときのスプレッドシートの modifiedTime"""
+        return self.get_meta("modified_time")
+
+    def set_modified_time(self, value: str) -> None:
+        self.set_meta("modified_time", value)
+
+    # --- 読み込み ---
+
+    def sheet_names(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT name FROM sheets ORDER BY position")]
+
+    def headers(self, sheet_name: str) -> Optional[List[str]]:
+        row = self.conn.execute("SELECT headers FROM sheets WHERE name = ?", (sheet_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def rows(self, sheet_name: str) -> List[Tuple[int, List[str]]]:
+        """(行番号, セル値のリスト) を行番号順に返す"""
+        cur = self.conn.execute(
+            "SELECT row_number, cells FROM rows WHERE sheet = ? ORDER BY row_number", (sheet_name,)
+        )
+        return [(n, json.loads(cells)) for n, cells in cur]
+
+    # --- 書き込み ---
+
+    def replace_sheet(self, sheet_name: str, position: int, headers: Sequence[str], rows: Sequence[Tuple[int, Sequence[str]]]) -> None:
+        """シート全体を置き換える（rows: (行番号, セル値)）"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sheets (name, position, headers) VALUES (?, ?, ?)",
+                (sheet_name, position, json.dumps(list(headers), ensure_ascii=False)),
+            )
+            self.conn.execute("DELETE FROM rows WHERE sheet = ?", (sheet_name,))
+            self.conn.executemany(
+                "INSERT INTO rows (sheet, row_number, cells) VALUES (?, ?, ?)",
+                [(sheet_name, n, json.dumps(list(cells), ensure_ascii=False)) for n, cells in rows],
+            )
+
+    def upsert_rows(self, sheet_name: str, rows: Sequence[Tuple[int, Sequence[str]]]) -> None:
+        """指定行だけを差し替える"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rows (sheet, row_number, cells) VALUES (?, ?, ?)",
+                [(sheet_name, n, json.dumps(list(cells), ensure_ascii=False)) for n, cells in rows],
+            )
+
+    def update_cells(self, sheet_name: str, row_number: int, updates: Dict[str, str]) -> None:
+        """保存済みの行の一部の列だけを書き換える（ミラーに無い行・シートは何もしない）"""
+        headers = self.headers(sheet_name)
+        row = self.conn.execute(
+            "SELECT cells FROM rows WHERE sheet = ? AND row_number = ?", (sheet_name, row_number)
+        ).fetchone()
+        if headers is None or row is None:
+            return
+        cells = json.loads(row[0])
+        cells.extend([""] * (len(headers) - len(cells)))
+        for key, value in updates.items():
+            if key in headers:
+                cells[headers.index(key)] = str(value).strip()
+        self.upsert_rows(sheet_name, [(row_number, cells)])
+
+    def delete_rows(self, sheet_name: str, row_numbers: Sequence[int]) -> None:
+        """指定行を削除（シート上で空になった行）"""
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM rows WHERE sheet = ? AND row_number = ?", [(sheet_name, n) for n in row_numbers]
+            )
+
+    def set_sheet_positions(self, names: Sequence[str]) -> None:
+        """シートの並び順を更新し、存在しないシートを削除"""
+        with self.conn:
+            existing = set(self.sheet_names())
+            for i, name in enumerate(names):
+                if name in existing:
+                    self.conn.execute("UPDATE sheets SET position = ? WHERE name = ?", (i, name))
+            for name in existing - set(names):
+                self.conn.execute("DELETE FROM sheets WHERE name = ?", (name,))
+                self.conn.execute("DELETE FROM rows WHERE sheet = ?", (name,))
+
+    def invalidate(self, sheet_name: Optional[str] = None) -> None:
+        """次回の同期で再取得させる（sheet_name 未指定なら全体）"""
+        with self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key = 'modified_time'")
+            if sheet_name is None:
+                self.conn.execute("DELETE FROM sheets")
+                self.conn.execute("DELETE FROM rows")
+            else:
+                self.conn.execute("DELETE FROM sheets WHERE name = ?", (sheet_name,))
+                self.conn.execute("DELETE FROM rows WHERE sheet = ?", (sheet_name,))
+
+
+_MIRROR: Optional[MinutesMirror] = None
+
+
+def get_mirror() -> Optional[MinutesMirror]:
+    """MINUTES_MIRROR_PATH が設定されていればミラーを返す（未設定なら None）"""
+    global _MIRROR
+    if not MINUTES_MIRROR_PATH:
+        return None
+    if _MIRROR is None:
+        _MIRROR = MinutesMirror(MINUTES_MIRROR_PATH)
+    return _MIRROR
@@ -3,45 +3,79 @@
 スプレッドシートの各シート（事業部ごと）を管理
 """
 import os
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Iterator, Mapping, Sequence, Callable, Any
+from datetime import date, datetime, timedelta
 from dateutil import tz
-from .google_clients import sheets as sheets_client
+from .google_clients import sheets as sheets_client, drive as drive_client, http_status
+from .minutes_row import EXPECTED_COLUMNS, MinutesRow, schema_for
+from .minutes_mirror import MinutesMirror, get_mirror
+
+# 公開API（EXPECTED_COLUMNS / MinutesRow は minutes_row からの再公開）
+__all__ = [
+    "EXPECTED_COLUMNS",
+    "MinutesRow",
+    "SheetSnapshot",
+    "SpreadsheetSnapshot",
+    "RowUpdateBuffer",
+    "is_system_sheet",
+    "archive_sheet_name",
+    "get_all_sheet_names",
+    "read_sheet_rows",
+    "load_snapshot",
+    "load_archive_snapshot",
+    "load_full_rows",
+    "with_full_rows",
+    "sync_mirror",
+    "get_headers",
+    "prefetch_headers",
+    "column_letter",
+    "get_column_letters",
+    "update_row",
+    "buffered_updates",
+    "append_row",
+    "append_rows",
+    "is_archivable",
+    "archive_completed_rows",
+    "now_jst",
+    "now_jst_str",
+    "date_plus_days",
+]
 
 PRIMARY_SHEET_ID = os.getenv("PRIMARY_SHEET_ID", "").strip()
 DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Tokyo")
+# ミラー同期で行単位の取得に切り替える上限（これを超える変更はシートごと再取得）
+MIRROR_MAX_ROW_FETCH = int(os.getenv("MINUTES_MIRROR_MAX_ROW_FETCH", "200") or "200")
+# ミラー同期の比較に使わない大きな本文の列（どのステージもスナップショットの判定に使わない列）
+# これらの列は、ステージが対象行の全列を読むときにシートから取り直す
+MIRROR_LAZY_COLUMNS = ["summary", "formatted_minutes", "decisions", "open_issues"]
+# 完了した会議行をアーカイブするまでの日数（next_meeting_date からの経過日数）
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "14") or "14")
+# 1回の移動（追記 + 削除）で扱う行数
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200") or "200")
+# 書き込みが 429 / 5xx で失敗したときの再試行回数と、待ち時間の基準秒数（指数バックオフ）
+SHEETS_WRITE_RETRIES = int(os.getenv("SHEETS_WRITE_RETRIES", "5") or "0")
+SHEETS_RETRY_BASE_SECONDS = float(os.getenv("SHEETS_RETRY_BASE_SECONDS", "1.0") or "0")
 
-# 想定される列名（スプレッドシートのヘッダー順と一致）
-EXPECTED_COLUMNS = [
-    "meeting_key",
-    "title",
-    "date",
-    "date_display",
-    "next_meeting_date",
-    "next_meeting_date_display",
-    "participants",
-    "hearing_text",
-    "doc_url",
-    "summary",
-    "formatted_minutes",
-    "final_minutes",
-    "decisions",
-    "open_issues",
-    "hearing_responses01",
-    "hearing_responses02",
-    "hearing_responses03",
-    "hearing_responses04",
-    "next_agenda",
-    "channel_id",
-    "minutes_posted",
-    "minutes_thread_ts",
-    "final_minutes_thread_ts",
-    "hearing_thread_ts",
-    "agenda_thread_ts",
-    "updated_at",
-    "status",
-    "remarks",
-]
+
+# 事業部シートではないシステム用シート（小文字で比較）
+SYSTEM_SHEETS = ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]
+# 事業部ごとのアーカイブシート名の接頭辞（例: archives_AI基盤）
+ARCHIVE_SHEET_PREFIX = "archives_"
+
+
+def is_system_sheet(sheet_name: str) -> bool:
+    """システム用シート（事業部ごとのアーカイブシートを含む）かどうか"""
+    name = sheet_name.lower()
+    return name in SYSTEM_SHEETS or name.startswith(ARCHIVE_SHEET_PREFIX)
+
+
+def archive_sheet_name(sheet_name: str) -> str:
+    """事業部シートに対応するアーカイブシート名"""
+    return f"{ARCHIVE_SHEET_PREFIX}{sheet_name}"
 
 
 def _sheets_service():
@@ -50,6 +84,18 @@ def _sheets_service():
     return sheets_client().spreadsheets()
 
 
+# シートごとのヘッダー行キャッシュ（1プロセス内で使い回す）
+_HEADER_CACHE: Dict[str, List[str]] = {}
+# シートごとのヘッダー名 -> 列名の対応表（元になったヘッダーと組で保持）
+_COLUMN_LETTER_CACHE: Dict[str, Tuple[List[str], Dict[str, str]]] = {}
+
+# buffered_updates() の実行中のみ設定される書き込みバッファ
+_ACTIVE_BUFFER: Optional["RowUpdateBuffer"] = None
+
+# ローカルミラーの同期はプロセスごとに1回
+_MIRROR_SYNCED = False
+
+
 def get_all_sheet_names() -> List[str]:
     """スプレッドシート内の全シート名を取得（事業部ごと）"""
     svc = _sheets_service()
@@ -57,100 +103,744 @@ def get_all_sheet_names() -> List[str]:
     return [s["properties"]["title"] for s in meta.get("sheets", [])]
 
 
-def read_sheet_rows(sheet_name: str) -> List[Dict[str, str]]:
-    """指定シートの全行を辞書のリストで取得"""
-    svc = _sheets_service()
-    # 全列対応：ヘッダーは1行目全体、データはシート全体から取得
-    result = svc.values().get(
-        spreadsheetId=PRIMARY_SHEET_ID,
-        range=f"{sheet_name}"
-    ).execute()
-    
-    values = result.get("values", [])
+def _rows_from_values(sheet_name: str, values: List[List[str]]) -> List[MinutesRow]:
+    """values.get の結果（1行目がヘッダー）を MinutesRow のリストに変換"""
     if not values:
         return []
     
     headers = values[0]
-    rows = []
-    for i, row in enumerate(values[1:], start=2):  # start=2 for row number
-        d = {headers[j]: (row[j] if j < len(row) else "") for j in range(len(headers))}
-        d["_row_number"] = i  # 実際の行番号を保持
-        rows.append(d)
-    
-    return rows
+    _HEADER_CACHE[sheet_name] = headers
+    schema = schema_for(headers)
+    # start=2 で実際の行番号を保持
+    return [MinutesRow(schema, row, i) for i, row in enumerate(values[1:], start=2)]
+
 
+def read_sheet_rows(sheet_name: str) -> List[MinutesRow]:
+    """指定シートの全行を MinutesRow（辞書と同じように参照できる行）のリストで取得"""
+    mirror = sync_mirror()
+    if mirror is not None and mirror.headers(sheet_name) is not None:
+        return list(_mirror_sheet(mirror, sheet_name).rows)
 
-def update_row(sheet_name: str, row_number: int, updates: Dict[str, str]) -> None:
-    """指定行の特定列を更新"""
     svc = _sheets_service()
-    
-    # まず現在のヘッダーを取得
+    # 全列対応：ヘッダーは1行目全体、データはシート全体から取得
     result = svc.values().get(
         spreadsheetId=PRIMARY_SHEET_ID,
-        range=f"{sheet_name}!1:1"
+        range=f"{sheet_name}"
     ).execute()
     
-    headers = result.get("values", [[]])[0]
-    if not headers:
-        print(f"[minutes_repo] No headers found in sheet {sheet_name}")
-        return
-    
-    # 現在の行を取得
-    current_row_result = svc.values().get(
+    return _rows_from_values(sheet_name, result.get("values", []))
+
+
+@dataclass(frozen=True)
+class SheetSnapshot:
+    """
+    1シート分の読み取り専用スナップショット
+    columns が None なら全列、指定時はその列だけを読み込んだ射影
+    """
+    name: str
+    headers: Tuple[str, ...]
+    rows: Tuple[Mapping[str, Any], ...]
+    columns: Optional[Tuple[str, ...]] = None
+
+
+@dataclass(frozen=True)
+class SpreadsheetSnapshot:
+    """
+    スプレッドシート全体の読み取り専用スナップショット
+    for sheet_name, rows in snapshot: の形で事業部シートを順に処理できる
+    """
+    sheets: Tuple[SheetSnapshot, ...]
+    loaded_at: str
+
+    def __iter__(self) -> Iterator[Tuple[str, Tuple[Mapping[str, Any], ...]]]:
+        for sheet in self.sheets:
+            yield sheet.name, sheet.rows
+
+    def __len__(self) -> int:
+        return len(self.sheets)
+
+    def sheet_names(self) -> List[str]:
+        return [sheet.name for sheet in self.sheets]
+
+    def rows(self, sheet_name: str) -> Tuple[Mapping[str, Any], ...]:
+        for sheet in self.sheets:
+            if sheet.name == sheet_name:
+                return sheet.rows
+        raise KeyError(sheet_name)
+
+
+def load_snapshot(columns: Optional[Sequence[str]] = None, include_system: bool = False) -> SpreadsheetSnapshot:
+    """
+    事業部シートをまとめて読み込む
+    - columns 未指定: シート名の取得1回 + values.batchGet 1回で全シートを全列取得
+    - columns 指定: ヘッダー行と指定列だけを取得（values.batchGet 2回）。
+      summary などの大きな列を読まずに済む。行ごとの全列は with_full_rows() で後から取得する
+    """
+    mirror = None if include_system else sync_mirror()
+    if mirror is not None:
+        # ミラーからは全列をローカルで返す（列の射影は不要）
+        sheets = [_mirror_sheet(mirror, name) for name in mirror.sheet_names()]
+        print(f"[minutes_repo] Loaded snapshot of {len(sheets)} sheets from local mirror")
+        return SpreadsheetSnapshot(sheets=tuple(sheets), loaded_at=now_jst_str())
+
+    names = [n for n in get_all_sheet_names() if include_system or not is_system_sheet(n)]
+    if columns is None:
+        sheets = _load_full_sheets(names)
+    else:
+        sheets = _load_projected_sheets(names, list(columns))
+    print(f"[minutes_repo] Loaded snapshot of {len(sheets)} sheets" + (f" (columns: {', '.join(columns)})" if columns is not None else ""))
+    return SpreadsheetSnapshot(sheets=tuple(sheets), loaded_at=now_jst_str())
+
+
+def load_archive_snapshot(columns: Sequence[str]) -> SpreadsheetSnapshot:
+    """事業部ごとのアーカイブシート（archives_<シート名>）から指定列だけを読み込む"""
+    names = [n for n in get_all_sheet_names() if n.lower().startswith(ARCHIVE_SHEET_PREFIX)]
+    sheets = _load_projected_sheets(names, list(columns))
+    print(f"[minutes_repo] Loaded {len(sheets)} archive sheets (columns: {', '.join(columns)})")
+    return SpreadsheetSnapshot(sheets=tuple(sheets), loaded_at=now_jst_str())
+
+
+def _load_full_sheets(names: List[str]) -> List[SheetSnapshot]:
+    """全シートの全列を values.batchGet 1回で取得"""
+    if not names:
+        return []
+    svc = _sheets_service()
+    value_ranges = svc.values().batchGet(
         spreadsheetId=PRIMARY_SHEET_ID,
-        range=f"{sheet_name}!{row_number}:{row_number}"
-    ).execute()
-    
-    current_row = current_row_result.get("values", [[]])[0] if current_row_result.get("values") else []
-    
-    # 現在の値をディクショナリに変換
-    row_dict = {headers[i]: (current_row[i] if i < len(current_row) else "") for i in range(len(headers))}
-    
-    # 更新を適用
-    row_dict.update(updates)
-    
-    # 新しい行データを作成
-    new_row = [row_dict.get(h, "") for h in headers]
-    
-    # 更新
-    svc.values().update(
+        ranges=names,
+    ).execute().get("valueRanges", [])
+    sheets = []
+    for i, name in enumerate(names):
+        values = value_ranges[i].get("values", []) if i < len(value_ranges) else []
+        rows = _rows_from_values(name, values)
+        sheets.append(SheetSnapshot(
+            name=name,
+            headers=tuple(values[0]) if values else (),
+            rows=tuple(rows),
+        ))
+    return sheets
+
+
+def _load_projected_sheets(names: List[str], columns: List[str]) -> List[SheetSnapshot]:
+    """
+    ヘッダー行から列位置を解決し、指定列だけを values.batchGet で取得
+    末尾の、指定列がすべて空の行は返らないため、行数をシートの行数として使わないこと
+    """
+    if not names:
+        return []
+    svc = _sheets_service()
+
+    # 1) ヘッダー行（キャッシュに無いシートのみ）
+    prefetch_headers(names)
+
+    # 2) 指定列（隣接列は1範囲にまとめる）
+    plan = []  # (シート名, ヘッダー, [(列番号, 列名)] の範囲ごとのリスト)
+    ranges = []
+    for name in names:
+        headers = _HEADER_CACHE.get(name, [])
+        index = {}
+        for i, h in enumerate(headers):
+            index.setdefault(h, i)
+        wanted = [(index[c], c) for c in dict.fromkeys(columns) if c in index]
+        runs = _contiguous_runs(wanted)
+        plan.append((name, headers, runs))
+        for run in runs:
+            ranges.append(f"{name}!{column_letter(run[0][0])}2:{column_letter(run[-1][0])}")
+
+    value_ranges = []
+    if ranges:
+        value_ranges = svc.values().batchGet(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            ranges=ranges,
+        ).execute().get("valueRanges", [])
+
+    sheets = []
+    pos = 0
+    for name, headers, runs in plan:
+        blocks = []
+        for run in runs:
+            values = value_ranges[pos].get("values", []) if pos < len(value_ranges) else []
+            blocks.append((run, values))
+            pos += 1
+        count = max((len(values) for _, values in blocks), default=0)
+        projected = tuple(c for run in runs for _, c in run)
+        schema = schema_for(projected)
+        rows = []
+        for r in range(count):
+            cells: List[str] = []
+            for run, values in blocks:
+                block = values[r] if r < len(values) else []
+                cells.extend(block[k] if k < len(block) else "" for k in range(len(run)))
+            rows.append(MinutesRow(schema, cells, r + 2))
+        sheets.append(SheetSnapshot(
+            name=name,
+            headers=tuple(headers),
+            rows=tuple(rows),
+            columns=projected,
+        ))
+    return sheets
+
+
+def load_full_rows(sheet_name: str, row_numbers: Sequence[int]) -> Dict[int, MinutesRow]:
+    """
+    指定行の全列をシートから取得（行番号 -> 行）
+    ミラー有効時は取得した行をミラーにも反映する（同期で比較しない大きな列もここで最新になる）
+    """
+    if not row_numbers:
+        return {}
+    numbers = list(dict.fromkeys(row_numbers))
+    full = _fetch_rows(sheet_name, numbers)
+    mirror = sync_mirror()
+    if mirror is not None and mirror.headers(sheet_name) is not None:
+        mirror.upsert_rows(sheet_name, _mirror_rows(list(full.values())))
+    return full
+
+
+def _fetch_rows(sheet_name: str, row_numbers: Sequence[int]) -> Dict[int, MinutesRow]:
+    """指定行の全列を values.batchGet 1回で取得"""
+    headers = get_headers(sheet_name)
+    if not headers or not row_numbers:
+        return {}
+    svc = _sheets_service()
+    value_ranges = svc.values().batchGet(
         spreadsheetId=PRIMARY_SHEET_ID,
-        range=f"{sheet_name}!A{row_number}",
-        valueInputOption="RAW",
-        body={"values": [new_row]}
+        ranges=[f"{sheet_name}!{n}:{n}" for n in row_numbers],
+    ).execute().get("valueRanges", [])
+    schema = schema_for(headers)
+    result = {}
+    for i, n in enumerate(row_numbers):
+        values = value_ranges[i].get("values", []) if i < len(value_ranges) else []
+        result[n] = MinutesRow(schema, values[0] if values else [], n)
+    return result
+
+
+def with_full_rows(sheet_name: str, rows: Sequence[Mapping[str, Any]], predicate: Callable[[Mapping[str, Any]], bool]) -> List[Mapping[str, Any]]:
+    """
+    射影読み込みした行のうち predicate を満たす候補行だけを全列の行に差し替える
+    候補行がすでに全列を持っていれば追加の読み込みはしない
+    （ミラーの行は全列を持つが、大きな列は同期で比較しないため候補行はシートから取り直す）
+    """
+    headers = get_headers(sheet_name)
+    refresh = get_mirror() is not None
+    targets = [
+        r["_row_number"] for r in rows
+        if predicate(r) and (refresh or not all(h in r for h in headers))
+    ]
+    if not targets:
+        return list(rows)
+    full = load_full_rows(sheet_name, targets)
+    print(f"[minutes_repo] Loaded {len(full)} full rows from sheet {sheet_name}")
+    return [full.get(r["_row_number"], r) for r in rows]
+
+
+def _spreadsheet_modified_time() -> str:
+    """Drive上のスプレッドシートの modifiedTime を取得"""
+    meta = drive_client().files().get(
+        fileId=PRIMARY_SHEET_ID,
+        fields="modifiedTime",
+        supportsAllDrives=True,
     ).execute()
-    
-    print(f"[minutes_repo] Updated row {row_number} in sheet {sheet_name}")
+    return meta.get("modifiedTime", "")
 
 
-def append_row(sheet_name: str, row_data: Dict[str, str]) -> None:
-    """新しい行を追加"""
+def _mirror_sheet(mirror: MinutesMirror, sheet_name: str) -> SheetSnapshot:
+    """ミラーに保存済みのシートを SheetSnapshot として返す"""
+    headers = mirror.headers(sheet_name) or []
+    _HEADER_CACHE[sheet_name] = headers
+    schema = schema_for(headers)
+    rows = tuple(MinutesRow(schema, cells, n) for n, cells in mirror.rows(sheet_name))
+    return SheetSnapshot(name=sheet_name, headers=tuple(headers), rows=rows)
+
+
+def _mirror_rows(rows: Sequence[MinutesRow]) -> List[Tuple[int, List[str]]]:
+    """ミラー保存用の (行番号, セル値) に変換"""
+    return [(row.row_number, list(row.cells)) for row in rows]
+
+
+def sync_mirror(force: bool = False) -> Optional[MinutesMirror]:
+    """
+    ローカルミラー（MINUTES_MIRROR_PATH）をスプレッドシートと同期して返す。未設定なら None
+    - Drive の modifiedTime が前回同期時と同じなら、メタデータ取得1回で終了
+    - 変わっていれば、大きな本文の列（MIRROR_LAZY_COLUMNS）以外をまとめて読んでミラーと行ごとに比較し、
+      値が変わった行・増えた行だけを全列取得する（updated_at を更新しない手作業の編集も拾う）
+    - ミラーにあって比較用の列がすべて空になった行は、全列を取り直して空なら削除する
+    - ヘッダーが変わったシート・新しいシート・変更行が多いシートはシートごと取得
+    MIRROR_LAZY_COLUMNS の列は、ステージが対象行の全列を読むとき（with_full_rows）にシートから取り直す
+    """
+    global _MIRROR_SYNCED
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    if _MIRROR_SYNCED and not force:
+        return mirror
+
+    modified = _spreadsheet_modified_time()
+    if not force and modified and modified == mirror.modified_time():
+        print(f"[minutes_repo] Local mirror is up to date (modifiedTime={modified})")
+        _MIRROR_SYNCED = True
+        return mirror
+
+    names = [n for n in get_all_sheet_names() if not is_system_sheet(n)]
+    # ヘッダーの変更を検知するため、ヘッダー行は取り直す
+    for name in names:
+        _HEADER_CACHE.pop(name, None)
+    headers = prefetch_headers(names)
+    known = set(mirror.sheet_names()) if not force else set()
+    full_names = [n for n in names if n not in known or headers.get(n, []) != mirror.headers(n)]
+    incremental = [n for n in names if n not in full_names]
+    columns = list(dict.fromkeys(h for n in incremental for h in headers[n] if h not in MIRROR_LAZY_COLUMNS))
+
+    changed: Dict[str, List[int]] = {}
+    for snap in _load_projected_sheets(incremental, columns):
+        local = {row.row_number: row for row in _mirror_sheet(mirror, snap.name).rows}
+        numbers = []
+        for row in snap.rows:
+            current = local.get(row.row_number)
+            if current is None or any(current.get(c, "") != row.get(c, "") for c in snap.columns or ()):
+                numbers.append(row.row_number)
+        # 比較用の列がすべて空の行（削除された行を含む）は全列を確認する
+        seen = {row.row_number for row in snap.rows}
+        numbers.extend(n for n in local if n not in seen)
+        if len(numbers) > MIRROR_MAX_ROW_FETCH:
+            full_names.append(snap.name)
+        elif numbers:
+            changed[snap.name] = numbers
+
+    positions = {name: i for i, name in enumerate(names)}
+    for sheet in _load_full_sheets(full_names):
+        mirror.replace_sheet(sheet.name, positions[sheet.name], sheet.headers, _mirror_rows(sheet.rows))
+    for name, numbers in changed.items():
+        full = _fetch_rows(name, numbers)
+        empty = [n for n, row in full.items() if not any(row.cells)]
+        mirror.upsert_rows(name, _mirror_rows([row for n, row in full.items() if n not in empty]))
+        mirror.delete_rows(name, empty)
+    mirror.set_sheet_positions(names)
+    if modified:
+        mirror.set_modified_time(modified)
+    _MIRROR_SYNCED = True
+
+    row_count = sum(len(v) for v in changed.values())
+    print(f"[minutes_repo] Synced local mirror: {len(full_names)} sheets reloaded, {row_count} rows refreshed")
+    return mirror
+
+
+def _mark_mirror_dirty(writes: Optional[Dict[Tuple[str, int], Dict[str, str]]] = None) -> None:
+    """
+    自分で書き込んだ後は、書き込んだセルをミラーにも反映し、
+    次回の同期でシートと値を比較させる
+    """
+    mirror = get_mirror()
+    if mirror is None:
+        return
+    for (sheet_name, row_number), updates in (writes or {}).items():
+        mirror.update_cells(sheet_name, row_number, updates)
+    mirror.set_meta("modified_time", "")
+
+
+def get_headers(sheet_name: str, refresh: bool = False) -> List[str]:
+    """指定シートのヘッダー行を取得（キャッシュ済みならAPIを呼ばない）"""
+    if not refresh and sheet_name in _HEADER_CACHE:
+        return _HEADER_CACHE[sheet_name]
     svc = _sheets_service()
-    
-    # ヘッダーを取得
     result = svc.values().get(
         spreadsheetId=PRIMARY_SHEET_ID,
         range=f"{sheet_name}!1:1"
     ).execute()
-    
-    headers = result.get("values", [[]])[0]
-    if not headers:
+    headers = (result.get("values") or [[]])[0]
+    if headers:
+        _HEADER_CACHE[sheet_name] = headers
+    return headers
+
+
+def prefetch_headers(sheet_names: Sequence[str]) -> Dict[str, List[str]]:
+    """キャッシュに無いシートのヘッダー行を values.batchGet 1回でまとめて取得"""
+    missing = [n for n in dict.fromkeys(sheet_names) if n not in _HEADER_CACHE]
+    if missing:
+        header_ranges = _sheets_service().values().batchGet(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            ranges=[f"{n}!1:1" for n in missing],
+        ).execute().get("valueRanges", [])
+        for i, name in enumerate(missing):
+            values = header_ranges[i].get("values", []) if i < len(header_ranges) else []
+            if values and values[0]:
+                _HEADER_CACHE[name] = values[0]
+    return {n: _HEADER_CACHE[n] for n in sheet_names if n in _HEADER_CACHE}
+
+
+def column_letter(index: int) -> str:
+    """0始まりの列番号をA1表記の列名に変換（0 -> A, 27 -> AB）"""
+    letters = ""
+    n = index + 1
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def get_column_letters(sheet_name: str) -> Dict[str, str]:
+    """ヘッダー名 -> 列名（A, B, ...）の対応表（ヘッダーキャッシュから生成）"""
+    headers = get_headers(sheet_name)
+    cached = _COLUMN_LETTER_CACHE.get(sheet_name)
+    if cached is not None and cached[0] is headers:
+        return cached[1]
+    letters: Dict[str, str] = {}
+    for i, h in enumerate(headers):
+        # 同名の列が複数ある場合は先頭を採用
+        letters.setdefault(h, column_letter(i))
+    _COLUMN_LETTER_CACHE[sheet_name] = (headers, letters)
+    return letters
+
+
+def _contiguous_runs(items: List[Tuple[int, Any]]) -> List[List[Tuple[int, Any]]]:
+    """(列番号, 値) のリストを列番号順に並べ、隣接する列ごとにまとめる"""
+    runs: List[List[Tuple[int, Any]]] = []
+    for col, value in sorted(items, key=lambda x: x[0]):
+        if runs and col == runs[-1][-1][0] + 1:
+            runs[-1].append((col, value))
+        else:
+            runs.append([(col, value)])
+    return runs
+
+
+def _cell_ranges(sheet_name: str, row_number: int, updates: Dict[str, str]) -> List[Dict]:
+    """
+    更新対象の列だけを書き込む ValueRange のリストを作る
+    隣接する列は1つの範囲（例: O5:R5）にまとめる
+    """
+    headers = get_headers(sheet_name)
+    index = {}
+    for i, h in enumerate(headers):
+        index.setdefault(h, i)
+
+    cols = []
+    for key, value in updates.items():
+        if key not in index:
+            print(f"[minutes_repo] Column '{key}' not found in sheet {sheet_name} (skipped)")
+            continue
+        cols.append((index[key], value))
+    data = []
+    for run in _contiguous_runs(cols):
+        first, last = column_letter(run[0][0]), column_letter(run[-1][0])
+        a1 = f"{first}{row_number}" if first == last else f"{first}{row_number}:{last}{row_number}"
+        data.append({
+            "range": f"{sheet_name}!{a1}",
+            "values": [[value for _, value in run]],
+        })
+    return data
+
+
+def _changed_only(updates: Dict[str, str], current: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """current（読み込み済みの行）と同じ値の列を除外する"""
+    if not current:
+        return dict(updates)
+    return {k: v for k, v in updates.items() if k not in current or current.get(k) != v}
+
+
+def _execute_with_retry(request: Any, label: str) -> Any:
+    """
+    書き込みリクエストを実行する。429 / 5xx は指数バックオフ（+ジッター）で
+    SHEETS_WRITE_RETRIES 回まで再試行し、それ以外のエラーはそのまま送出する
+    """
+    attempt = 0
+    while True:
+        try:
+            return request.execute()
+        except Exception as e:
+            status = http_status(e)
+            if status is None or not (status == 429 or status >= 500) or attempt >= SHEETS_WRITE_RETRIES:
+                raise
+            delay = SHEETS_RETRY_BASE_SECONDS * (2 ** attempt)
+            delay += random.uniform(0, SHEETS_RETRY_BASE_SECONDS)
+            attempt += 1
+            print(f"[minutes_repo] {label} failed with HTTP {status}; retrying in {delay:.1f}s ({attempt}/{SHEETS_WRITE_RETRIES})")
+            time.sleep(delay)
+
+
+def update_row(sheet_name: str, row_number: int, updates: Dict[str, str], current: Optional[Dict[str, str]] = None, flush: bool = False) -> None:
+    """
+    指定行の特定列を更新（変更された列のセルだけを書き込む）
+    current に読み込み済みの行を渡すと、値が変わらない列は送らない
+    buffered_updates() 中はバッファに積むだけ。flush=True なら積んだ直後にバッファを書き込む
+    （Slack への投稿を記録する書き込みなど、後続の失敗で失いたくない更新に使う）
+    """
+    if _ACTIVE_BUFFER is not None:
+        _ACTIVE_BUFFER.add(sheet_name, row_number, updates, current=current)
+        if flush:
+            _ACTIVE_BUFFER.flush()
+        return
+
+    changes = _changed_only(updates, current)
+    if not changes:
+        return
+
+    if not get_headers(sheet_name):
         print(f"[minutes_repo] No headers found in sheet {sheet_name}")
         return
+
+    data = _cell_ranges(sheet_name, row_number, changes)
+    if not data:
+        return
+
+    svc = _sheets_service()
+    if len(data) == 1:
+        request = svc.values().update(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            range=data[0]["range"],
+            valueInputOption="RAW",
+            body={"values": data[0]["values"]}
+        )
+    else:
+        request = svc.values().batchUpdate(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            body={"valueInputOption": "RAW", "data": data},
+        )
+    _execute_with_retry(request, f"Update of row {row_number} in sheet {sheet_name}")
     
+    _mark_mirror_dirty({(sheet_name, row_number): changes})
+    print(f"[minutes_repo] Updated row {row_number} in sheet {sheet_name} ({', '.join(sorted(changes))})")
+
+
+class RowUpdateBuffer:
+    """
+    複数シート・複数行への update_row をまとめて書き込むバッファ（Unit of Work）
+    - add() は同一行への更新をマージしてメモリに保持するだけ
+    - flush() で変更セルだけを values.batchUpdate 1回で反映
+      （429 / 5xx は再試行し、それでも失敗したら更新をバッファに戻して例外を送出）
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[Tuple[str, int], Dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, sheet_name: str, row_number: int, updates: Dict[str, str], current: Optional[Dict[str, str]] = None) -> None:
+        """更新を積む（同じ行への後の更新が優先）"""
+        changes = _changed_only(updates, current)
+        if changes:
+            self._pending.setdefault((sheet_name, row_number), {}).update(changes)
+
+    def flush(self) -> int:
+        """積まれた更新をまとめて書き込み、書き込んだ行数を返す"""
+        if not self._pending:
+            return 0
+        pending = self._pending
+        self._pending = {}
+
+        data = []
+        rows = 0
+        for (sheet_name, row_number), updates in pending.items():
+            if not get_headers(sheet_name):
+                print(f"[minutes_repo] No headers found in sheet {sheet_name}")
+                continue
+            cells = _cell_ranges(sheet_name, row_number, updates)
+            if cells:
+                data.extend(cells)
+                rows += 1
+        if not data:
+            return 0
+
+        svc = _sheets_service()
+        try:
+            _execute_with_retry(
+                svc.values().batchUpdate(
+                    spreadsheetId=PRIMARY_SHEET_ID,
+                    body={"valueInputOption": "RAW", "data": data},
+                ),
+                f"Flush of {rows} buffered row updates",
+            )
+        except Exception:
+            # 書き込めなかった更新は、その後に積まれた更新を優先してバッファに戻す
+            for key, updates in self._pending.items():
+                pending.setdefault(key, {}).update(updates)
+            self._pending = pending
+            raise
+        _mark_mirror_dirty(pending)
+        print(f"[minutes_repo] Flushed {rows} buffered row updates ({len(data)} ranges)")
+        return rows
+
+
+@contextmanager
+def buffered_updates():
+    """
+    with ブロック内の update_row をバッファに積み、終了時に一括で書き込む
+    例外で抜けた場合も、それまでに積んだ更新は書き込む。
+    その書き込みも失敗したときはログに残し、元の例外を送出する
+    """
+    global _ACTIVE_BUFFER
+    if _ACTIVE_BUFFER is not None:
+        # ネスト時は外側のバッファにまとめる
+        yield _ACTIVE_BUFFER
+        return
+    buffer = RowUpdateBuffer()
+    _ACTIVE_BUFFER = buffer
+    try:
+        yield buffer
+    except BaseException:
+        _ACTIVE_BUFFER = None
+        try:
+            buffer.flush()
+        except Exception as flush_error:
+            print(f"[minutes_repo] Failed to flush {len(buffer)} buffered row updates: {flush_error}")
+        raise
+    _ACTIVE_BUFFER = None
+    buffer.flush()
+
+
+def append_row(sheet_name: str, row_data: Dict[str, str]) -> None:
+    """新しい行を追加"""
+    append_rows(sheet_name, [row_data])
+
+
+def append_rows(sheet_name: str, rows: Sequence[Dict[str, str]]) -> int:
+    """複数行を values.append 1回で追加し、追加した行数を返す"""
+    if not rows:
+        return 0
+
+    # ヘッダーを取得（キャッシュ優先）
+    headers = get_headers(sheet_name)
+    if not headers:
+        print(f"[minutes_repo] No headers found in sheet {sheet_name}")
+        return 0
+
     # 行データを作成
-    new_row = [row_data.get(h, "") for h in headers]
-    
+    values = [[row_data.get(h, "") for h in headers] for row_data in rows]
+
     # 追加
-    svc.values().append(
+    _sheets_service().values().append(
         spreadsheetId=PRIMARY_SHEET_ID,
         range=f"{sheet_name}",
         valueInputOption="RAW",
         insertDataOption="INSERT_ROWS",
-        body={"values": [new_row]}
+        body={"values": values}
     ).execute()
-    
-    print(f"[minutes_repo] Appended new row to sheet {sheet_name}")
+
+    _mark_mirror_dirty()
+    print(f"[minutes_repo] Appended {len(values)} new row(s) to sheet {sheet_name}")
+    return len(values)
+
+
+def is_archivable(row: MinutesRow, today: date) -> bool:
+    """
+    アーカイブ対象（完了した会議）かどうか
+    最終版議事録を投稿済み（final_minutes_thread_ts あり）で、
+    next_meeting_date から ARCHIVE_AFTER_DAYS 日以上経過した行
+    """
+    if not row.get("final_minutes_thread_ts", ""):
+        return False
+    next_day = row.next_meeting_day
+    return next_day is not None and next_day <= today - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def _sheet_ids() -> Dict[str, int]:
+    """シート名 -> sheetId"""
+    svc = _sheets_service()
+    meta = svc.get(
+        spreadsheetId=PRIMARY_SHEET_ID,
+        fields="sheets.properties(sheetId,title)",
+    ).execute()
+    return {s["properties"]["title"]: s["properties"]["sheetId"] for s in meta.get("sheets", [])}
+
+
+def _ensure_archive_sheet(archive_name: str, headers: Sequence[str], sheet_ids: Dict[str, int]) -> None:
+    """アーカイブシートが無ければ作成し、ヘッダー行を書き込む"""
+    svc = _sheets_service()
+    if archive_name not in sheet_ids:
+        res = svc.batchUpdate(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            body={"requests": [{"addSheet": {"properties": {"title": archive_name}}}]},
+        ).execute()
+        replies = res.get("replies", [{}])
+        sheet_ids[archive_name] = replies[0].get("addSheet", {}).get("properties", {}).get("sheetId")
+        print(f"[minutes_repo] Created archive sheet {archive_name}")
+    if not get_headers(archive_name, refresh=True):
+        svc.values().update(
+            spreadsheetId=PRIMARY_SHEET_ID,
+            range=f"{archive_name}!A1",
+            valueInputOption="RAW",
+            body={"values": [list(headers) + ["archived_at"]]},
+        ).execute()
+        _HEADER_CACHE[archive_name] = list(headers) + ["archived_at"]
+
+
+def _row_ranges_descending(row_numbers: Sequence[int]) -> List[Tuple[int, int]]:
+    """行番号を連続範囲 (開始, 終了) にまとめ、下の範囲から順に返す"""
+    ranges: List[Tuple[int, int]] = []
+    for n in sorted(set(row_numbers), reverse=True):
+        if ranges and n == ranges[-1][0] - 1:
+            ranges[-1] = (n, ranges[-1][1])
+        else:
+            ranges.append((n, n))
+    return ranges
+
+
+def archive_completed_rows(dry_run: bool = False) -> int:
+    """
+    完了した会議行を事業部ごとのアーカイブシート（archives_<シート名>）へ移動し、移動した行数を返す
+    - 判定に必要な列だけを読み、対象行だけ全列を取得
+    - ARCHIVE_BATCH_SIZE 行ごとに values.append 1回 + 行削除の batchUpdate 1回
+    - 下の行から移動するため、移動中に残りの対象行の行番号はずれない
+    - 追記後に削除するため、途中で失敗しても行は失われない（アーカイブ側に重複し得る）
+    """
+    today = now_jst().date()
+    sheet_ids = _sheet_ids()
+    names = [n for n in sheet_ids if not is_system_sheet(n)]
+    sheets = _load_projected_sheets(names, ["final_minutes_thread_ts", "next_meeting_date"])
+    svc = _sheets_service()
+    mirror = get_mirror()
+
+    moved = 0
+    for sheet in sheets:
+        targets = sorted((r.row_number for r in sheet.rows if is_archivable(r, today)), reverse=True)
+        if not targets:
+            continue
+        print(f"[minutes_repo] {len(targets)} completed rows to archive in sheet {sheet.name}")
+        if dry_run:
+            moved += len(targets)
+            continue
+
+        archive_name = archive_sheet_name(sheet.name)
+        _ensure_archive_sheet(archive_name, sheet.headers, sheet_ids)
+        archived_at = now_jst_str()
+
+        for start in range(0, len(targets), ARCHIVE_BATCH_SIZE):
+            batch = targets[start:start + ARCHIVE_BATCH_SIZE]
+            full = _fetch_rows(sheet.name, batch)
+            # シート上の並び順（昇順）でアーカイブへ追記
+            values = [list(full[n].cells) + [archived_at] for n in sorted(full)]
+            svc.values().append(
+                spreadsheetId=PRIMARY_SHEET_ID,
+                range=f"{archive_name}",
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body={"values": values},
+            ).execute()
+            requests = [
+                {
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": sheet_ids[sheet.name],
+                            "dimension": "ROWS",
+                            "startIndex": first - 1,
+                            "endIndex": last,
+                        }
+                    }
+                }
+                for first, last in _row_ranges_descending(list(full))
+            ]
+            svc.batchUpdate(
+                spreadsheetId=PRIMARY_SHEET_ID,
+                body={"requests": requests},
+            ).execute()
+            moved += len(values)
+            print(f"[minutes_repo] Archived {len(values)} rows from {sheet.name} to {archive_name}")
+
+        # 行番号がずれたため、ミラーのこのシートは次回に再取得させる
+        if mirror is not None:
+            mirror.invalidate(sheet.name)
+
+    print(f"[minutes_repo] Archive finished: {moved} rows{' (dry run)' if dry_run else ''}")
+    return moved
 
 
 def now_jst() -> datetime:
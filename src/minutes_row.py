@@ -0,0 +1,181 @@
+"""
+議事録シートの行モデル
+行ごとの辞書の代わりに、シート共通のスキーマ（ヘッダー -> 列位置）と値のタプルで1行を表す
+"""
+import re
+import sys
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# 想定される列名（スプレッドシートのヘッダー順と一致）
+EXPECTED_COLUMNS = [
+    "meeting_key",
+    "title",
+    "date",
+    "date_display",
+    "next_meeting_date",
+    "next_meeting_date_display",
+    "participants",
+    "hearing_text",
+    "doc_url",
+    "summary",
+    "formatted_minutes",
+    "final_minutes",
+    "decisions",
+    "open_issues",
+    "hearing_responses01",
+    "hearing_responses02",
+    "hearing_responses03",
+    "hearing_responses04",
+    "next_agenda",
+    "channel_id",
+    "minutes_posted",
+    "minutes_thread_ts",
+    "final_minutes_thread_ts",
+    "hearing_thread_ts",
+    "agenda_thread_ts",
+    "updated_at",
+    "status",
+    "remarks",
+]
+
+ROW_NUMBER_KEY = "_row_number"
+
+# doc_url から Docs のファイルIDを取り出す
+DOC_ID_PATTERN = re.compile(r"/document/d/([^/?#]+)")
+
+# 未解析を表す番兵（None は「解析済みで日付なし」を表す）
+_UNPARSED = object()
+
+
+def doc_id_from_url(doc_url: str) -> str:
+    """Docs の URL からファイルIDを取り出す（取り出せなければ空文字）"""
+    m = DOC_ID_PATTERN.search(doc_url or "")
+    return m.group(1) if m else ""
+
+
+class RowSchema:
+    """ヘッダー列の並び。同じヘッダーのシート間・行間で1つを共有する"""
+
+    __slots__ = ("headers", "index")
+
+    def __init__(self, headers: Sequence[str]) -> None:
+        self.headers: Tuple[str, ...] = tuple(sys.intern(str(h)) for h in headers)
+        index: Dict[str, int] = {}
+        for i, h in enumerate(self.headers):
+            # 同名の列が複数ある場合は先頭を採用
+            index.setdefault(h, i)
+        self.index = index
+
+
+_SCHEMA_CACHE: Dict[Tuple[str, ...], RowSchema] = {}
+
+
+def schema_for(headers: Sequence[str]) -> RowSchema:
+    """ヘッダーに対応するスキーマを返す（同じヘッダーなら同じインスタンス）"""
+    key = tuple(headers)
+    schema = _SCHEMA_CACHE.get(key)
+    if schema is None:
+        schema = RowSchema(key)
+        _SCHEMA_CACHE[key] = schema
+    return schema
+
+
+MINUTES_SCHEMA = schema_for(EXPECTED_COLUMNS)
+
+
+def _parse_day(value: str) -> Optional[date]:
+    """"YYYY-MM-DD" または ISO日時の先頭10文字を日付として解釈"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+class MinutesRow(Mapping):
+    """
+    シート1行分の読み取り専用ビュー
+    - 値は読み込み時に strip 済み
+    - row["_row_number"] / row.row_number で実際の行番号を取得できる
+    - date / next_meeting_date は date_day / next_meeting_day で date 型として取得（初回のみ解析）
+    辞書と同じく row.get("title", "") や "agenda_thread_ts" in row が使える
+    """
+
+    __slots__ = ("_schema", "_values", "row_number", "_date_day", "_next_meeting_day")
+
+    def __init__(self, schema: RowSchema, values: Sequence[Any], row_number: int) -> None:
+        n = len(schema.headers)
+        vals = [v.strip() if isinstance(v, str) else ("" if v is None else str(v)) for v in values[:n]]
+        if len(vals) < n:
+            vals.extend([""] * (n - len(vals)))
+        self._schema = schema
+        self._values: Tuple[str, ...] = tuple(vals)
+        self.row_number = row_number
+        self._date_day: Any = _UNPARSED
+        self._next_meeting_day: Any = _UNPARSED
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], row_number: Optional[int] = None) -> "MinutesRow":
+        """辞書（_row_number を含んでもよい）から生成"""
+        headers = [k for k in data if k != ROW_NUMBER_KEY]
+        number = row_number if row_number is not None else int(data.get(ROW_NUMBER_KEY, 0) or 0)
+        return cls(schema_for(headers), [data[h] for h in headers], number)
+
+    def __getitem__(self, key: str) -> Any:
+        i = self._schema.index.get(key)
+        if i is not None:
+            return self._values[i]
+        if key == ROW_NUMBER_KEY:
+            return self.row_number
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._schema.index.get(key)
+        if i is not None:
+            return self._values[i]
+        if key == ROW_NUMBER_KEY:
+            return self.row_number
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._schema.index or key == ROW_NUMBER_KEY
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._schema.index
+        yield ROW_NUMBER_KEY
+
+    def __len__(self) -> int:
+        return len(self._schema.index) + 1
+
+    def __repr__(self) -> str:
+        return f"MinutesRow(row_number={self.row_number}, title={self.get('title', '')!r})"
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        return self._schema.headers
+
+    @property
+    def cells(self) -> Tuple[str, ...]:
+        """ヘッダー順のセル値"""
+        return self._values
+
+    @property
+    def date_day(self) -> Optional[date]:
+        """date 列の日付部分"""
+        if self._date_day is _UNPARSED:
+            self._date_day = _parse_day(self.get("date", ""))
+        return self._date_day
+
+    @property
+    def next_meeting_day(self) -> Optional[date]:
+        """next_meeting_date 列の日付部分"""
+        if self._next_meeting_day is _UNPARSED:
+            self._next_meeting_day = _parse_day(self.get("next_meeting_date", ""))
+        return self._next_meeting_day
+
+    def to_dict(self) -> Dict[str, Any]:
+        """従来形式の辞書に変換"""
+        return dict(self.items())
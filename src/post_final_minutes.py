@@ -8,19 +8,30 @@
 動作:
 - SLACK_BOT_TOKEN_REVIEW を用いてチャンネルにトップ投稿
 - 成功時、final_minutes_thread_ts と updated_at を保存
+- 投稿は outbox（slack_client）経由で行い、中断後の再実行でも二重投稿しない
 """
 import os
-from .slack_client import SlackClient
+from typing import Optional, Sequence, Mapping
+from .slack_client import SlackClient, outbox_key, outbox_row
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst_str,
 )
 from .text_split import split_main_and_thread
+from .blob_store import BlobLoadError, load_text
 
 DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "").strip()
 
+# スナップショットで読む列（最終版があり未投稿の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["final_minutes", "final_minutes_thread_ts"]
+
+# outbox（Slack 投稿の送信待ち行列）上のステージ名
+OUTBOX_STAGE = "final_minutes"
+
 
 def should_post_final(row: dict) -> bool:
     has_text = bool((row.get("final_minutes") or "").strip())
@@ -28,9 +39,14 @@ def should_post_final(row: dict) -> bool:
     return has_text and not_posted
 
 
-def post_for_sheet(sheet_name: str, slack_client: SlackClient):
+def post_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     print(f"[post_final_minutes] Checking sheet: {sheet_name}")
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
+
+    # 最終版があり未投稿の行だけ全列を取得（最終版の無い過去の行は読まない）
+    rows = with_full_rows(sheet_name, rows, should_post_final)
 
     for row in rows:
         if not should_post_final(row):
@@ -41,7 +57,12 @@ def post_for_sheet(sheet_name: str, slack_client: SlackClient):
             print(f"[post_final_minutes] No channel_id for: {row.get('title')}")
             continue
 
-        text = (row.get("final_minutes") or "").strip()
+        # 退避済みの本文（blob:sha256:...）はここで読み込む
+        try:
+            text = load_text((row.get("final_minutes") or "").strip()).strip()
+        except BlobLoadError as e:
+            print(f"[post_final_minutes] ERROR: final_minutes could not be loaded for: {row.get('title')} ({e}); not posting")
+            continue
         if not text:
             continue
 
@@ -51,16 +72,7 @@ def post_for_sheet(sheet_name: str, slack_client: SlackClient):
         mentions = ""
         if participants_str:
             participant_emails = [p.strip() for p in participants_str.split(',') if p.strip()]
-            slack_ids = []
-            for email in participant_emails:
-                sid = slack_client.lookup_user_id_by_email(email)
-                if not sid and "@initialbrain.jp" in email:
-                    converted_email = email.replace("@initialbrain.jp", "@nexx-inc.jp")
-                    sid = slack_client.lookup_user_id_by_email(converted_email)
-                if sid:
-                    slack_ids.append(f"<@{sid}>")
-            if slack_ids:
-                mentions = " ".join(slack_ids)
+            mentions = slack_client.mention_text(participant_emails)
         # 本文とスレッドに分割（決定事項の詳細 以下はスレッドへ）。
         main_text, thread_text = split_main_and_thread(text)
         # 万一、親側が空になった場合は従来通り全文を親に投稿（重複回避）
@@ -70,36 +82,60 @@ def post_for_sheet(sheet_name: str, slack_client: SlackClient):
         if mentions:
             main_text = f"{mentions}\n\n{main_text}" if main_text else mentions
 
+        # 親メッセージ → 決定事項の詳細（あれば）の順に、outbox 経由で1回だけ投稿
+        messages = [{"text": main_text}]
+        if thread_text:
+            messages.append({"text": thread_text, "reply_to": 0})
+        row_number = row.get("_row_number")
+        date_day = (row.get("date") or "").strip()[:10]
         print(f"[post_final_minutes] Posting final minutes for: {title}")
-        ts = slack_client.post_message(channel_id, main_text)
-        if ts and row.get("_row_number"):
-            update_row(sheet_name, row["_row_number"], {
+        sent = slack_client.send_once(outbox_key(sheet_name, row, OUTBOX_STAGE, date_day), channel_id, messages)
+        ts = sent[0]
+        if ts and row_number:
+            update_row(sheet_name, row_number, {
                 "final_minutes_thread_ts": ts,
                 "updated_at": now_jst_str(),
-            })
-            print(f"[post_final_minutes] Posted ts={ts} and updated row {row['_row_number']}")
-
-            # 決定事項の詳細 以降があればスレッドに投稿
-            try:
-                if thread_text:
-                    slack_client.post_message(channel_id, thread_text, thread_ts=ts)
+            }, flush=True)
+            print(f"[post_final_minutes] Posted ts={ts} and updated row {row_number}")
+            if thread_text:
+                if sent[1]:
                     print("[post_final_minutes] Posted detail section in thread")
-            except Exception as e:
-                print(f"[post_final_minutes] Failed to post detail thread: {e}")
+                else:
+                    print("[post_final_minutes] Detail section is pending; it will be retried on the next run")
+
+
+def record_resumed_posts(resumed) -> None:
+    """再開して投稿できた最終版の ts を、まだ記録していない行の final_minutes_thread_ts に書き戻す"""
+    resumed = [(key, sent) for key, sent in resumed if sent and sent[0]]
+    if not resumed:
+        return
+    sheets = dict(iter(load_snapshot(columns=["doc_url", "final_minutes_thread_ts"])))
+    for key, sent in resumed:
+        row = outbox_row(key, sheets.get(key[0], ()))
+        if row is None or row.get("final_minutes_thread_ts"):
+            continue
+        update_row(key[0], row["_row_number"], {
+            "final_minutes_thread_ts": sent[0],
+            "updated_at": now_jst_str(),
+        }, current=row, flush=True)
+        print(f"[post_final_minutes] Recorded resumed post ts={sent[0]} in row {row['_row_number']} of {key[0]}")
 
 
 def main():
     slack_client = SlackClient(token=os.getenv("SLACK_BOT_TOKEN_REVIEW", "").strip() or None)
-    for sheet_name in get_all_sheet_names():
-        if sheet_name.lower() in [
-            "mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"
-        ]:
-            continue
-        try:
-            post_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[post_final_minutes] Error processing sheet {sheet_name}: {e}")
-            continue
+    # 前回の実行で送り切れなかった投稿を先に送る
+    record_resumed_posts(slack_client.resume_outbox(OUTBOX_STAGE))
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
+
+    # 行更新はステージ終了時にまとめて書き込む（Slack 投稿の記録はその場で書き込む）
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                post_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[post_final_minutes] Error processing sheet {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
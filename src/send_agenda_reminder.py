@@ -3,13 +3,16 @@
 next_meeting_dateの前日18:00（JST）にSlackへ次回議題を投稿
 """
 import os
+from typing import Optional, Sequence, Mapping
 from datetime import datetime, timedelta
-from .slack_client import SlackClient
+from .slack_client import SlackClient, outbox_key, outbox_row
 from .google_clients import docs as docs_client, drive as drive_client, calendar as calendar_client
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst,
     now_jst_str,
 )
@@ -17,6 +20,13 @@ from .business_date import business_days_before
 
 DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "").strip()
 
+# スナップショットで読む列（送信対象の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["next_meeting_date", "next_agenda"]
+
+# outbox（Slack 投稿の送信待ち行列）上のステージ名
+OUTBOX_STAGE = "agenda"
+OUTBOX_NUDGE_STAGE = "agenda_nudge"
+
 
 def create_google_doc(title: str, content: str) -> str:
     """
@@ -183,11 +193,19 @@ def _create_event_with_doc(cal_svc, calendar_id: str, date_str: str, title: str,
         return False
 
 
-def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient):
+def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     """1つのシートに対して議題共有送信チェック"""
     print(f"[send_agenda_reminder] Checking sheet: {sheet_name}")
     
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
+
+    # 送信対象になり得る行だけ全列を取得
+    rows = with_full_rows(sheet_name, rows, lambda r: (
+        bool(r.get("next_agenda", "").strip())
+        and should_send_agenda_reminder(r.get("next_meeting_date", "").strip())
+    ))
     
     for row in rows:
         next_meeting_date = row.get("next_meeting_date", "").strip()
@@ -221,27 +239,19 @@ def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient):
         mentions = ""
         if participants_str:
             participant_emails = [p.strip() for p in participants_str.split(',') if p.strip()]
-            slack_ids = []
-            
-            for email in participant_emails:
-                # メールからSlack IDを取得（ドメイン変換含む）
-                slack_id = slack_client.lookup_user_id_by_email(email)
-                
-                # ドメイン変換: @initialbrain.jp -> @nexx-inc.jp
-                if not slack_id and "@initialbrain.jp" in email:
-                    converted_email = email.replace("@initialbrain.jp", "@nexx-inc.jp")
-                    slack_id = slack_client.lookup_user_id_by_email(converted_email)
-                
-                if slack_id:
-                    slack_ids.append(f"<@{slack_id}>")
-            
-            if slack_ids:
-                mentions = " ".join(slack_ids)
+            # メールからSlack IDを取得（ドメインの読み替え含む）
+            mentions = slack_client.mention_text(participant_emails)
         
+        # 前回の実行で投稿を始めていれば、Docs作成・カレンダー更新は済んでいるため繰り返さない
+        key = outbox_key(sheet_name, row, OUTBOX_STAGE, next_meeting_date)
+        resumed = slack_client.outbox_started(key)
+
         # 次回議題用のGoogle Docsを作成し、カレンダーイベントの説明にURLを追加
         doc_title = f"{title} - 次回議題 ({next_meeting_date})"
-        agenda_doc_url = create_google_doc(doc_title, next_agenda)
-        if agenda_doc_url:
+        agenda_doc_url = create_google_doc(doc_title, next_agenda) if not resumed else ""
+        if resumed:
+            print(f"[send_agenda_reminder] Resuming agenda posts for: {title}")
+        elif agenda_doc_url:
             try:
                 cal_svc = calendar_client()
                 calendar_id = os.getenv("CALENDAR_ID", "primary")
@@ -263,9 +273,28 @@ def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient):
         # Slackにはテキストのみ送る（Docsリンクは含めない）
         message = create_agenda_message(title, next_meeting_date, next_agenda, mentions)
         
-        # Slack投稿（親メッセージ）
+        # 案内: 追加議題・参考リンクの締切をスレッドに投稿（こちらが正規の送付先）
+        guidance = (
+            "アジェンダに議案や資料を追加したい場合は、こちらのスレッドで下記フォーマットで@DRベガパンク宛に送信ください。\n"
+            "テキストを送るときは、本文に必ず @DRベガパンク をつけてください。\n"
+            "修正要望がない場合も議事録の内容を確認した旨を返信してください。\n"
+            "【期日:会議開始10分前まで】\n"
+            "⇩議案追加＆資料追加依頼フォーマット　⇩　※必要な方のみでOK\n"
+            "【議案追加】\n"
+            "・タイトル：\n"
+            "・背景：\n"
+            "・論点：\n"
+            "・担当：\n"
+            "【資料追加】 ※対象議案は番号のみでOK\n"
+            "・対象議案：\n"
+            "・資料名：\n"
+            "・URL："
+        )
+
+        # 親メッセージ → 案内 の順に、outbox 経由で1回だけ投稿
         print(f"[send_agenda_reminder] Sending agenda reminder for: {title}")
-        ts = slack_client.post_message(channel_id, message)
+        sent = slack_client.send_once(key, channel_id, [{"text": message}, {"text": guidance, "reply_to": 0}])
+        ts = sent[0]
         
         if ts:
             # 送信成功: remarksに送信済みマークを追記 + agenda_thread_ts の保存（なければ minutes_posted を後方互換で使用）
@@ -280,30 +309,12 @@ def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient):
                     updates["agenda_thread_ts"] = ts
                 elif "minutes_posted" in row:
                     updates["minutes_posted"] = ts
-                update_row(sheet_name, row_number, updates)
+                update_row(sheet_name, row_number, updates, flush=True)
                 print(f"[send_agenda_reminder] Successfully sent and updated row {row_number}")
-            # 案内: 追加議題・参考リンクの締切をスレッドに投稿（こちらが正規の送付先）
-            try:
-                guidance = (
-                    "アジェンダに議案や資料を追加したい場合は、こちらのスレッドで下記フォーマットで@DRベガパンク宛に送信ください。\n"
-                    "テキストを送るときは、本文に必ず @DRベガパンク をつけてください。\n"
-                    "修正要望がない場合も議事録の内容を確認した旨を返信してください。\n"
-                    "【期日:会議開始10分前まで】\n"
-                    "⇩議案追加＆資料追加依頼フォーマット　⇩　※必要な方のみでOK\n"
-                    "【議案追加】\n"
-                    "・タイトル：\n"
-                    "・背景：\n"
-                    "・論点：\n"
-                    "・担当：\n"
-                    "【資料追加】 ※対象議案は番号のみでOK\n"
-                    "・対象議案：\n"
-                    "・資料名：\n"
-                    "・URL："
-                )
-                slack_client.post_message(channel_id, guidance, thread_ts=ts)
+            if sent[1]:
                 print("[send_agenda_reminder] Posted agenda guidance in thread")
-            except Exception as e:
-                print(f"[send_agenda_reminder] Failed to post agenda guidance: {e}")
+            else:
+                print("[send_agenda_reminder] Agenda guidance is pending; it will be retried on the next run")
         else:
             print(f"[send_agenda_reminder] Failed to send agenda for: {title}")
 
@@ -324,41 +335,72 @@ def send_agenda_for_sheet(sheet_name: str, slack_client: SlackClient):
                             "テキストを送るときは、本文に必ず @DRベガパンク をつけてください。"
                         )
                         print(f"[send_agenda_reminder] Sending 9AM nudge for: {title}")
-                        if target_thread_ts:
-                            slack_client.post_message(channel_id, nudge_text, thread_ts=target_thread_ts)
-                        else:
-                            nts = slack_client.post_message(channel_id, nudge_text)
-                            if nts and row.get("_row_number") and "agenda_thread_ts" in row:
-                                update_row(sheet_name, row["_row_number"], {"agenda_thread_ts": nts, "updated_at": now_jst_str()})
+                        nudge_key = outbox_key(sheet_name, row, OUTBOX_NUDGE_STAGE, next_meeting_date)
+                        nts = slack_client.send_once(nudge_key, channel_id, [{"text": nudge_text, "thread_ts": target_thread_ts or None}])[0]
+                        if nts and not target_thread_ts and row.get("_row_number") and "agenda_thread_ts" in row:
+                            update_row(sheet_name, row["_row_number"], {"agenda_thread_ts": nts, "updated_at": now_jst_str()})
                         # マーカー付与
                         if row.get("_row_number"):
                             update_row(sheet_name, row["_row_number"], {
                                 "remarks": f"{remarks} {nudge_marker}".strip(),
                                 "updated_at": now_jst_str(),
-                            })
+                            }, flush=True)
                             print(f"[send_agenda_reminder] Nudge marker saved for row {row['_row_number']}")
         except Exception as e:
             print(f"[send_agenda_reminder] Failed to send 9AM nudge: {e}")
 
 
+def record_resumed_posts(resumed) -> None:
+    """
+    再開して投稿できた議題共有を行に書き戻す（送信済みマークと agenda_thread_ts）
+    催促（OUTBOX_NUDGE_STAGE）はマークだけを書き戻す
+    """
+    resumed = [(key, sent) for key, sent in resumed if sent and sent[0]]
+    if not resumed:
+        return
+    sheets = dict(iter(load_snapshot(columns=["doc_url", "next_meeting_date", "remarks", "agenda_thread_ts", "minutes_posted"])))
+    for key, sent in resumed:
+        row = outbox_row(key, sheets.get(key[0], ()))
+        if row is None:
+            continue
+        remarks = row.get("remarks", "")
+        updates = {}
+        if key[2] == OUTBOX_NUDGE_STAGE:
+            marker = f"agenda_nudge_sent:{key[3]}"
+        else:
+            marker = f"agenda_sent:{key[3]}"
+            if "agenda_thread_ts" in row:
+                if not row.get("agenda_thread_ts"):
+                    updates["agenda_thread_ts"] = sent[0]
+            elif "minutes_posted" in row and not row.get("minutes_posted"):
+                updates["minutes_posted"] = sent[0]
+        if marker not in remarks:
+            updates["remarks"] = f"{remarks} {marker}".strip()
+        if not updates:
+            continue
+        updates["updated_at"] = now_jst_str()
+        update_row(key[0], row["_row_number"], updates, current=row, flush=True)
+        print(f"[send_agenda_reminder] Recorded resumed {key[2]} post ts={sent[0]} in row {row['_row_number']} of {key[0]}")
+
+
 def main():
     """メイン処理"""
     # 最終アジェンダ投稿は AGENDA ボット
     slack_client = SlackClient(token=os.getenv("SLACK_BOT_TOKEN_AGENDA", "").strip() or None)
+    # 前回の実行で送り切れなかった投稿を先に送る
+    record_resumed_posts(slack_client.resume_outbox(OUTBOX_STAGE) + slack_client.resume_outbox(OUTBOX_NUDGE_STAGE))
     
-    # 全シートをチェック
-    sheet_names = get_all_sheet_names()
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
     
-    for sheet_name in sheet_names:
-        # システムシートはスキップ
-        if sheet_name.lower() in ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]:
-            continue
-        
-        try:
-            send_agenda_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[send_agenda_reminder] Error processing sheet {sheet_name}: {e}")
-            continue
+    # 行更新はステージ終了時にまとめて書き込む（Slack 投稿の記録はその場で書き込む）
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                send_agenda_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[send_agenda_reminder] Error processing sheet {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
@@ -3,12 +3,15 @@
 next_meeting_dateの2日前09:00（JST）にSlackへヒアリング依頼を投稿
 """
 import os
+from typing import Optional, Sequence, Mapping
 from datetime import datetime, timedelta
-from .slack_client import SlackClient
+from .slack_client import SlackClient, outbox_key, outbox_row
 from .minutes_repo import (
-    get_all_sheet_names,
+    load_snapshot,
     read_sheet_rows,
     update_row,
+    buffered_updates,
+    with_full_rows,
     now_jst,
     now_jst_str,
 )
@@ -16,6 +19,11 @@ from .business_date import business_days_before
 
 DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "").strip()
 
+# スナップショットで読む列（送信対象の行だけ後から全列を取得する）
+SNAPSHOT_COLUMNS = ["next_meeting_date", "hearing_thread_ts", "date", "title"]
+# outbox のステージ名（同じ会議・次回日付へのヒアリング依頼は1回だけ投稿する）
+OUTBOX_STAGE = "hearing"
+
 
 def should_send_hearing_reminder(next_meeting_date_str: str) -> bool:
     """
@@ -82,11 +90,21 @@ def create_hearing_message(next_meeting_date: str, participants: list = None, pr
     
 
 
-def send_hearing_for_sheet(sheet_name: str, slack_client: SlackClient):
+def send_hearing_for_sheet(sheet_name: str, slack_client: SlackClient, rows: Optional[Sequence[Mapping]] = None):
     """1つのシートに対してヒアリング依頼送信チェック"""
     print(f"[send_hearing_reminder] Checking sheet: {sheet_name}")
     
-    rows = read_sheet_rows(sheet_name)
+    # スナップショット未指定時はシートを直接読む
+    if rows is None:
+        rows = read_sheet_rows(sheet_name)
+
+    # 送信対象になり得る行だけ全列を取得
+    today_str = now_jst().strftime("%Y-%m-%d")
+    rows = with_full_rows(sheet_name, rows, lambda r: (
+        not r.get("hearing_thread_ts", "").strip()
+        and r.get("date", "").strip() != today_str
+        and should_send_hearing_reminder(r.get("next_meeting_date", "").strip())
+    ))
     
     for row in rows:
         next_meeting_date = row.get("next_meeting_date", "").strip()
@@ -118,15 +136,19 @@ def send_hearing_for_sheet(sheet_name: str, slack_client: SlackClient):
             continue
         
         # 投稿先スレッドの決定ロジック
+        # - 前回の実行で outbox に登録済みなら、そのときのスレッドに送る
         # - final_minutes_thread_ts が存在し、かつ返信がある場合は final を優先
         # - final に返信が無い（= 親のみ）場合は minutes_thread_ts を優先（修正なしとみなす）
         # - どちらも無ければスキップ
-        target_thread_ts = None
-        if final_minutes_thread_ts:
+        key = outbox_key(sheet_name, row, OUTBOX_STAGE, next_meeting_date)
+        target_thread_ts = slack_client.outbox_thread_ts(key)
+        if target_thread_ts:
+            print(f"[send_hearing_reminder] Resuming queued hearing reminder for: {row.get('title')}")
+        elif final_minutes_thread_ts:
             try:
-                replies = slack_client.fetch_thread_replies(channel_id, final_minutes_thread_ts)
-                # Slack APIは親メッセージも含む返却のため、2件以上で「返信あり」とみなす
-                if len(replies) >= 2:
+                # 返信の有無だけ分かればよいため、親メッセージの reply_count だけを読む
+                reply_count = slack_client.count_thread_replies(channel_id, final_minutes_thread_ts)
+                if reply_count:
                     target_thread_ts = final_minutes_thread_ts
                 else:
                     target_thread_ts = minutes_thread_ts or final_minutes_thread_ts
@@ -156,19 +178,10 @@ def send_hearing_for_sheet(sheet_name: str, slack_client: SlackClient):
             row.get("hearing_responses04", ""),
         ]
         
-        # メンション生成（participantsのメールをSlack IDに変換。ドメイン変換フォールバック含む）
+        # メンション生成（participantsのメールをSlack IDに変換。ドメインの読み替え含む）
         mentions = ""
         if participants:
-            slack_ids = []
-            for email in participants:
-                slack_id = slack_client.lookup_user_id_by_email(email)
-                if not slack_id and "@initialbrain.jp" in email:
-                    converted_email = email.replace("@initialbrain.jp", "@nexx-inc.jp")
-                    slack_id = slack_client.lookup_user_id_by_email(converted_email)
-                if slack_id:
-                    slack_ids.append(f"<@{slack_id}>")
-            if slack_ids:
-                mentions = " ".join(slack_ids)
+            mentions = slack_client.mention_text(participants)
 
         # hearing_text（任意列）を取得
         hearing_text = row.get("hearing_text", "").strip()
@@ -176,41 +189,60 @@ def send_hearing_for_sheet(sheet_name: str, slack_client: SlackClient):
         # メッセージ生成（hearing_text優先、メンション付与）
         message = create_hearing_message(next_meeting_date, participants, previous_responses, mentions, hearing_text)
         
-        # Slack投稿（議事録のスレッド＝最終があれば最終）
+        # Slack投稿（議事録のスレッド＝最終があれば最終）。outbox 経由で1回だけ投稿し、前回投稿済みなら記録済みの ts を使う
         print(f"[send_hearing_reminder] Sending hearing reminder for: {title}")
         print(f"[send_hearing_reminder] Posting to thread: {target_thread_ts}")
-        thread_ts = slack_client.post_message(channel_id, message, thread_ts=target_thread_ts)
+        ts = slack_client.send_once(key, channel_id, [{"text": message, "thread_ts": target_thread_ts}])[0]
         
-        if thread_ts:
-            # 送信成功: hearing_thread_tsを記録（議事録と同じスレッド）
+        if ts:
+            # 送信成功: 投稿したスレッドを hearing_thread_ts に記録（回答収集はこのスレッドの返信を読む）
             row_number = row.get("_row_number")
             if row_number:
                 update_row(sheet_name, row_number, {
                     "hearing_thread_ts": target_thread_ts,  # 実際に投下したスレッドを保存
                     "updated_at": now_jst_str(),
-                })
+                }, flush=True)
                 print(f"[send_hearing_reminder] Successfully sent and updated row {row_number}")
         else:
             print(f"[send_hearing_reminder] Failed to send reminder for: {title}")
 
 
+def record_resumed_posts(slack_client: SlackClient, resumed) -> None:
+    """再開して投稿できたヒアリング依頼のスレッドを、まだ記録していない行の hearing_thread_ts に書き戻す"""
+    resumed = [key for key, sent in resumed if sent and sent[0]]
+    if not resumed:
+        return
+    sheets = dict(iter(load_snapshot(columns=["doc_url", "next_meeting_date", "hearing_thread_ts"])))
+    for key in resumed:
+        row = outbox_row(key, sheets.get(key[0], ()))
+        # 投稿したスレッドは登録時に決めたもの（返信の ts ではない）
+        thread_ts = slack_client.outbox_thread_ts(key)
+        if row is None or not thread_ts or row.get("hearing_thread_ts"):
+            continue
+        update_row(key[0], row["_row_number"], {
+            "hearing_thread_ts": thread_ts,
+            "updated_at": now_jst_str(),
+        }, current=row, flush=True)
+        print(f"[send_hearing_reminder] Recorded resumed thread {thread_ts} in row {row['_row_number']} of {key[0]}")
+
+
 def main():
     """メイン処理"""
     slack_client = SlackClient()
+    # 前回の実行で送り切れなかった投稿を先に送る
+    record_resumed_posts(slack_client, slack_client.resume_outbox(OUTBOX_STAGE))
     
-    # 全シートをチェック
-    sheet_names = get_all_sheet_names()
+    # 全シートをまとめて読み込む（システムシートは除外済み）
+    snapshot = load_snapshot(columns=SNAPSHOT_COLUMNS)
     
-    for sheet_name in sheet_names:
-        # システムシートはスキップ
-        if sheet_name.lower() in ["mappings", "meetings", "items", "agendas", "archives", "hearing_prompts", "hearing_responses"]:
-            continue
-        
-        try:
-            send_hearing_for_sheet(sheet_name, slack_client)
-        except Exception as e:
-            print(f"[send_hearing_reminder] Error processing sheet {sheet_name}: {e}")
-            continue
+    # 行更新はステージ終了時にまとめて書き込む（Slack 投稿の記録はその場で書き込む）
+    with buffered_updates():
+        for sheet_name, rows in snapshot:
+            try:
+                send_hearing_for_sheet(sheet_name, slack_client, rows)
+            except Exception as e:
+                print(f"[send_hearing_reminder] Error processing sheet {sheet_name}: {e}")
+                continue
 
 
 if __name__ == "__main__":
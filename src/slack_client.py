@@ -1,9 +1,161 @@
+import atexit
+import json
 import os
-from typing import Optional, List, Dict, Any
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+import random
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterable, Mapping, Tuple
+from .minutes_row import doc_id_from_url
 
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "").strip()
+# メール→Slack ID の対応表（users.list 1回分）を保存する場所と有効期間
+SLACK_USER_DIRECTORY_PATH = os.getenv("SLACK_USER_DIRECTORY_PATH", ".cache/slack_user_directory.json").strip()
+SLACK_USER_DIRECTORY_TTL_HOURS = float(os.getenv("SLACK_USER_DIRECTORY_TTL_HOURS", "24") or "24")
+# カレンダー上のドメインと Slack 上のドメインが違う場合の読み替え（"旧:新" をカンマ区切り）
+SLACK_EMAIL_DOMAIN_ALIASES = os.getenv("SLACK_EMAIL_DOMAIN_ALIASES", "initialbrain.jp:nexx-inc.jp").strip()
+
+# 取得済みのスレッドのメッセージを保存する SQLite（空なら毎回全件取得）と、全件を取り直す間隔
+# （差分取得では古いメッセージの編集・削除を拾えないため、この間隔で全件に置き換える）
+SLACK_THREAD_CACHE_PATH = os.getenv("SLACK_THREAD_CACHE_PATH", ".cache/slack_threads.sqlite3").strip()
+SLACK_THREAD_CACHE_REFRESH_HOURS = float(os.getenv("SLACK_THREAD_CACHE_REFRESH_HOURS", "24") or "0")
+# チャンネルの履歴（conversations.history）を1回読み、返信のあったスレッドだけを取得する
+# 遡る日数（これより古いスレッドは従来どおり直接取得する。0 で無効）
+SLACK_CHANNEL_SCAN_DAYS = float(os.getenv("SLACK_CHANNEL_SCAN_DAYS", "30") or "0")
+# 投稿の送信待ち行列（outbox）の SQLite。空なら従来どおり直接投稿する
+# 中断された送信は、作成から SLACK_OUTBOX_RESUME_HOURS 以内なら次回の実行で再開し、保持期間を過ぎたら削除する
+SLACK_OUTBOX_PATH = os.getenv("SLACK_OUTBOX_PATH", ".cache/slack_outbox.sqlite3").strip()
+SLACK_OUTBOX_RESUME_HOURS = float(os.getenv("SLACK_OUTBOX_RESUME_HOURS", "24") or "0")
+SLACK_OUTBOX_RETENTION_DAYS = float(os.getenv("SLACK_OUTBOX_RETENTION_DAYS", "14") or "0")
+# レート制限（ratelimited / HTTP 429）時の再試行回数と、Retry-After に足すゆらぎの最大秒数
+SLACK_RATE_LIMIT_RETRIES = int(os.getenv("SLACK_RATE_LIMIT_RETRIES", "5") or "0")
+SLACK_RETRY_JITTER_SECONDS = float(os.getenv("SLACK_RETRY_JITTER_SECONDS", "1.0") or "0")
+
+# Slack API のメソッドごとの Tier（1分あたりの目安回数）。ここに無いメソッドは Tier 3 扱い
+# https://api.slack.com/docs/rate-limits
+SLACK_TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+SLACK_METHOD_TIERS = {
+    "users.list": 2,
+    "users.lookupByEmail": 3,
+    "conversations.join": 3,
+    "conversations.history": 3,
+    "conversations.replies": 3,
+}
+# chat.postMessage は Tier ではなくチャンネルごとに1秒1件程度
+SLACK_POST_PER_CHANNEL_PER_MINUTE = 60
+
+# slack_sdk は最初に Slack API を呼ぶときに読み込む（起動時間短縮）
+WebClient = None
+SlackApiError = None
+
+
+def _load_slack_sdk() -> None:
+    global WebClient, SlackApiError
+    if WebClient is None:
+        from slack_sdk import WebClient as _WebClient
+        from slack_sdk.errors import SlackApiError as _SlackApiError
+        WebClient, SlackApiError = _WebClient, _SlackApiError
+
+class TokenBucket:
+    """1分あたり rate_per_minute 回、最大 burst 回まで連続で通すトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, burst if burst is not None else rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """トークンを1つ取る（無ければ貯まるまで待つ）。戻り値: 待った秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self) -> None:
+        """サーバー側で制限されたとき、手元のバケットも空にして後続の呼び出しを待たせる"""
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+
+# バケットと集計はモジュール全体（＝同じプロセスの全 SlackClient / 全トークン）で共有する
+_BUCKETS: Dict[Tuple[str, str], TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+_RATE_STATS: Dict[str, Dict[str, float]] = {}
+_REPORT_REGISTERED = False
+
+
+def _bucket(method: str, channel: str = "") -> TokenBucket:
+    key = (method, channel if method == "chat.postMessage" else "")
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            if method == "chat.postMessage":
+                bucket = TokenBucket(SLACK_POST_PER_CHANNEL_PER_MINUTE, burst=1)
+            else:
+                bucket = TokenBucket(SLACK_TIER_RATES[SLACK_METHOD_TIERS.get(method, 3)])
+            _BUCKETS[key] = bucket
+    return bucket
+
+
+def _count(method: str, name: str, amount: float = 1) -> None:
+    global _REPORT_REGISTERED
+    with _BUCKETS_LOCK:
+        stats = _RATE_STATS.setdefault(method, {"calls": 0, "delayed": 0, "throttled": 0, "retried": 0, "wait_seconds": 0.0})
+        stats[name] += amount
+        if not _REPORT_REGISTERED:
+            atexit.register(report_rate_limits)
+            _REPORT_REGISTERED = True
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, float]]:
+    """メソッドごとの集計（calls / delayed: 手元で待った / throttled: Slack に制限された / retried / wait_seconds）"""
+    with _BUCKETS_LOCK:
+        return {method: dict(stats) for method, stats in _RATE_STATS.items()}
+
+
+def report_rate_limits() -> None:
+    for method, stats in sorted(rate_limit_stats().items()):
+        if stats["delayed"] or stats["throttled"] or stats["retried"]:
+            print(
+                f"[slack] {method}: {int(stats['calls'])} calls, {int(stats['delayed'])} delayed, "
+                f"{int(stats['throttled'])} throttled, {int(stats['retried'])} retried, waited {stats['wait_seconds']:.1f}s"
+            )
+
+
+def _api_error(e: Exception) -> Optional[str]:
+    """SlackApiError のエラーコード（"not_in_channel" / "ratelimited" など）"""
+    response = getattr(e, "response", None)
+    try:
+        return response.get("error") if response is not None else None
+    except Exception:
+        return None
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """レート制限なら Retry-After の秒数（ヘッダーが無ければ 1 秒）。それ以外は None"""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    if status != 429 and _api_error(e) != "ratelimited":
+        return None
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 1.0
+
+
 try:
     from .text_normalize import normalize_slack_shortcodes
 except Exception:
@@ -11,20 +163,528 @@ except Exception:
     def normalize_slack_shortcodes(text: str) -> str:
         return text
 
+def parse_domain_aliases(spec: str) -> List[tuple]:
+    """"a.jp:b.jp,c.jp:d.jp" -> [("a.jp", "b.jp"), ("c.jp", "d.jp")]"""
+    aliases = []
+    for item in spec.split(","):
+        src, sep, dst = item.strip().partition(":")
+        if sep and src.strip() and dst.strip():
+            aliases.append((src.strip().lower().lstrip("@"), dst.strip().lower().lstrip("@")))
+    return aliases
+
+
+class SlackUserDirectory:
+    """
+    メールアドレス → Slack ユーザーID の対応表
+    users.list をページングして1回で全員分を作り、ファイルに保存して TTL の間は使い回す
+    見つからないメールはドメインの読み替えを試し、それでも無ければ users.lookupByEmail で個別に問い合わせる
+    """
+
+    def __init__(self, slack: "SlackClient", path: str = SLACK_USER_DIRECTORY_PATH,
+                 ttl_hours: float = SLACK_USER_DIRECTORY_TTL_HOURS,
+                 domain_aliases: str = SLACK_EMAIL_DOMAIN_ALIASES) -> None:
+        self.slack = slack
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.aliases = parse_domain_aliases(domain_aliases)
+        self._users: Optional[Dict[str, str]] = None
+        # 対応表を users.list で作った時刻（個別に追加しても TTL は延ばさない）
+        self._fetched_at = 0.0
+        # lookupByEmail でも見つからなかったメール（この実行中は再問い合わせしない）
+        self._missing: set = set()
+
+    def candidates(self, email: str) -> List[str]:
+        """元のメールと、ドメインを読み替えたメール（重複なし、小文字）"""
+        email = email.strip().lower()
+        result = [email]
+        local, _, domain = email.rpartition("@")
+        for src, dst in self.aliases:
+            if local and domain == src:
+                converted = f"{local}@{dst}"
+                if converted not in result:
+                    result.append(converted)
+        return result
+
+    def lookup(self, email: str) -> Optional[str]:
+        """メールアドレスから Slack ID（見つからなければ None）"""
+        if not email or not email.strip():
+            return None
+        users = self._load()
+        candidates = self.candidates(email)
+        for candidate in candidates:
+            if candidate in users:
+                return users[candidate]
+        # 対応表に無い（users.list 以降に参加した人など）場合だけ個別に問い合わせる
+        for candidate in candidates:
+            if candidate in self._missing:
+                continue
+            if candidate != candidates[0]:
+                print(f"[slack] Trying converted email: {candidates[0]} -> {candidate}")
+            user_id = self.slack.lookup_user_id_by_email(candidate)
+            if user_id:
+                users[candidate] = user_id
+                self._save(users)
+                return user_id
+            self._missing.add(candidate)
+        return None
+
+    def mentions(self, emails: Iterable[str]) -> List[str]:
+        """メールアドレスの並びを "<@ID>" の並びに（見つからない人は除く、重複なし）"""
+        result: List[str] = []
+        for email in emails:
+            user_id = self.lookup(email)
+            if user_id and f"<@{user_id}>" not in result:
+                result.append(f"<@{user_id}>")
+        return result
+
+    def _load(self) -> Dict[str, str]:
+        if self._users is not None:
+            return self._users
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            fetched_at = float(data.get("fetched_at", 0))
+            if time.time() - fetched_at < self.ttl_seconds:
+                self._fetched_at = fetched_at
+                self._users = dict(data.get("users", {}))
+                print(f"[slack] Loaded {len(self._users)} users from {self.path}")
+                return self._users
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        users = self._sweep()
+        if users is None:
+            # users.list が使えない（権限不足など）場合は個別の問い合わせだけで進める（次回の実行で再試行）
+            self._users = {}
+            return self._users
+        self._users = users
+        self._fetched_at = time.time()
+        self._save(users)
+        return users
+
+    def _sweep(self) -> Optional[Dict[str, str]]:
+        """users.list を最後のページまで読み、メール → ID の対応表を作る"""
+        if not self.slack.client:
+            return None
+        users: Dict[str, str] = {}
+        cursor = None
+        try:
+            while True:
+                res = self.slack.call("users.list", cursor=cursor, limit=200)
+                for member in res.get("members", []):
+                    if member.get("deleted") or member.get("is_bot"):
+                        continue
+                    email = (member.get("profile", {}).get("email") or "").strip().lower()
+                    if email:
+                        users[email] = member["id"]
+                cursor = res.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            print(f"[slack] users.list failed; falling back to lookupByEmail: {e}")
+            return None
+        print(f"[slack] Fetched {len(users)} users with users.list")
+        return users
+
+    def _save(self, users: Dict[str, str]) -> None:
+        if not self.path or not self._fetched_at:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self._fetched_at, "users": users}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[slack] Could not save user directory {self.path}: {e}")
+
+
+_THREAD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    channel TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    latest_ts TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    PRIMARY KEY (channel, thread_ts)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    channel TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (channel, thread_ts, ts)
+);
+"""
+
+
+def _ts_key(ts: str) -> float:
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SlackThreadCache:
+    """
+    (チャンネル, スレッドTS) ごとに、取得済みのメッセージを保存するキャッシュ
+    次回は最後に見たメッセージより新しいもの（oldest 指定）だけを取得して追記する
+    """
+
+    def __init__(self, path: str, refresh_hours: float = SLACK_THREAD_CACHE_REFRESH_HOURS) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.refresh_seconds = refresh_hours * 3600
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_THREAD_SCHEMA)
+
+    def get(self, channel: str, thread_ts: str) -> Tuple[List[Dict[str, Any]], str, bool]:
+        """(保存済みメッセージ（ts 昇順）, 最後のメッセージの ts, 全件を取り直す時期か)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT latest_ts, refreshed_at FROM threads WHERE channel = ? AND thread_ts = ?",
+                (channel, thread_ts),
+            ).fetchone()
+            if row is None:
+                return [], "", True
+            messages = [
+                json.loads(m)
+                for (m,) in self.conn.execute(
+                    "SELECT message FROM messages WHERE channel = ? AND thread_ts = ?", (channel, thread_ts)
+                )
+            ]
+        messages.sort(key=lambda m: _ts_key(m.get("ts", "")))
+        stale = bool(self.refresh_seconds) and time.time() - row[1] >= self.refresh_seconds
+        return messages, row[0], stale
+
+    def put(self, channel: str, thread_ts: str, messages: List[Dict[str, Any]], replace: bool) -> None:
+        """messages を保存（replace なら全件取得の結果としてスレッドを置き換える）"""
+        with self._lock, self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM messages WHERE channel = ? AND thread_ts = ?", (channel, thread_ts))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages (channel, thread_ts, ts, message) VALUES (?, ?, ?, ?)",
+                [(channel, thread_ts, m.get("ts", ""), json.dumps(m, ensure_ascii=False)) for m in messages if m.get("ts")],
+            )
+            latest = self.conn.execute(
+                "SELECT ts FROM messages WHERE channel = ? AND thread_ts = ? ORDER BY CAST(ts AS REAL) DESC LIMIT 1",
+                (channel, thread_ts),
+            ).fetchone()
+            if replace:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO threads (channel, thread_ts, latest_ts, refreshed_at) VALUES (?, ?, ?, ?)",
+                    (channel, thread_ts, latest[0] if latest else "", time.time()),
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE threads SET latest_ts = ? WHERE channel = ? AND thread_ts = ?",
+                    (latest[0] if latest else "", channel, thread_ts),
+                )
+
+
+class SlackChannelScanner:
+    """
+    チャンネルの直近の履歴を実行ごとに1回だけ読み、スレッドの親メッセージ（reply_count / latest_reply）を覚える
+    返信の有無・最新の返信時刻が分かるため、変化のないスレッドは conversations.replies を呼ばずに済む
+    """
+
+    def __init__(self, slack: "SlackClient", lookback_days: float = SLACK_CHANNEL_SCAN_DAYS) -> None:
+        self.slack = slack
+        self.lookback_days = lookback_days
+        # channel -> {ts: 親メッセージ} と、読んだ範囲の開始時刻（読めなかったチャンネルは None）
+        self._parents: Dict[str, Optional[Dict[str, Dict[str, Any]]]] = {}
+        self._oldest: Dict[str, float] = {}
+
+    def parent(self, channel: str, thread_ts: str, scan: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        スレッドの親メッセージ（履歴に含まれていれば）
+        読んだ範囲より古い・履歴を読めない・見つからない場合は None（呼び出し側は直接取得する）
+        scan=False なら、まだ読んでいないチャンネルは読まずに None を返す
+        """
+        if not self.lookback_days or not channel:
+            return None
+        if channel not in self._parents:
+            if not scan:
+                return None
+            self._scan(channel)
+        parents = self._parents.get(channel)
+        if parents is None or _ts_key(thread_ts) < self._oldest.get(channel, 0):
+            return None
+        return parents.get(thread_ts)
+
+    def _scan(self, channel: str) -> None:
+        oldest = time.time() - self.lookback_days * 86400
+        parents: Dict[str, Dict[str, Any]] = {}
+        cursor = None
+        try:
+            while True:
+                res = self.slack.call(
+                    "conversations.history", channel=channel, oldest=f"{oldest:.6f}", cursor=cursor, limit=200,
+                )
+                for message in res.get("messages", []):
+                    ts = message.get("ts")
+                    # スレッド内の返信（チャンネルにも表示したもの）は親ではない
+                    if ts and message.get("thread_ts", ts) == ts:
+                        parents[ts] = message
+                cursor = res.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            print(f"[slack] conversations_history error for {channel}: {e}")
+            self._parents[channel] = None
+            return
+        active = sum(1 for m in parents.values() if m.get("reply_count"))
+        print(f"[slack] scanned {channel}: {len(parents)} messages, {active} threads with replies")
+        self._parents[channel] = parents
+        self._oldest[channel] = oldest
+
+
+_THREAD_CACHE: Optional[SlackThreadCache] = None
+_THREAD_CACHE_LOCK = threading.Lock()
+
+
+def get_thread_cache() -> Optional[SlackThreadCache]:
+    """SLACK_THREAD_CACHE_PATH が設定されていればキャッシュを返す（空なら None）"""
+    global _THREAD_CACHE
+    if not SLACK_THREAD_CACHE_PATH:
+        return None
+    with _THREAD_CACHE_LOCK:
+        if _THREAD_CACHE is None:
+            _THREAD_CACHE = SlackThreadCache(SLACK_THREAD_CACHE_PATH)
+    return _THREAD_CACHE
+
+
+_OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    sheet TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    date TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    text TEXT NOT NULL,
+    thread_ts TEXT,
+    reply_to INTEGER,
+    ts TEXT,
+    sending_at REAL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    PRIMARY KEY (sheet, doc_id, stage, date, seq)
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (stage, ts);
+"""
+
+# outbox のスキーマを変えたら上げる（古い表は作り直す）
+_OUTBOX_SCHEMA_VERSION = 2
+
+# (シート名, Docs のファイルID, ステージ, 日付)。同じキーの投稿は1回だけ送る
+# 行番号はアーカイブの行削除でずれるため、キーには使わない
+OutboxKey = Tuple[str, str, str, str]
+# 送信済みの投稿を、中断後に Slack 側から見つけるためのメッセージメタデータの種別
+OUTBOX_EVENT_TYPE = "minutes_outbox"
+
+
+class SlackOutbox:
+    """
+    投稿の送信待ち行列
+    キーごとに投稿（親 + スレッド返信）をまとめて登録し、seq 順に送って送信済みの ts を記録する
+    送信を試みた後のキーは再登録しても内容を変えないため、途中で止まった実行を再実行しても二重投稿にならない
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != _OUTBOX_SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS outbox")
+            self.conn.execute(f"PRAGMA user_version = {_OUTBOX_SCHEMA_VERSION}")
+        self.conn.executescript(_OUTBOX_SCHEMA)
+        self.prune()
+
+    def enqueue(self, key: OutboxKey, channel: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        messages（{"text", "thread_ts"?, "reply_to"?}）を seq 0, 1, ... として登録
+        reply_to は同じキーの seq（その投稿のスレッドに返信する）
+        同じキーがまだ1件も送信を試みていなければ、新しい内容で置き換える（チャンネルや本文の修正を反映する）
+        送信を試みた・送信済みの投稿があれば登録せず False（登録済みの内容で送る）
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            attempted, existing = self.conn.execute(
+                "SELECT COUNT(ts) + COUNT(sending_at), COUNT(*) FROM outbox "
+                "WHERE sheet = ? AND doc_id = ? AND stage = ? AND date = ?",
+                key,
+            ).fetchone()
+            if attempted:
+                return False
+            if existing:
+                self.conn.execute("DELETE FROM outbox WHERE sheet = ? AND doc_id = ? AND stage = ? AND date = ?", key)
+            self.conn.executemany(
+                "INSERT INTO outbox (sheet, doc_id, stage, date, seq, channel, text, thread_ts, reply_to, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (*key, seq, channel, m["text"], m.get("thread_ts"), m.get("reply_to"), now)
+                    for seq, m in enumerate(messages)
+                ],
+            )
+        return True
+
+    def messages(self, key: OutboxKey) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT seq, channel, text, thread_ts, reply_to, ts, sending_at FROM outbox "
+                "WHERE sheet = ? AND doc_id = ? AND stage = ? AND date = ? ORDER BY seq",
+                key,
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def mark_sending(self, key: OutboxKey, seq: int) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET sending_at = ? WHERE sheet = ? AND doc_id = ? AND stage = ? AND date = ? AND seq = ?",
+                (time.time(), *key, seq),
+            )
+
+    def ack(self, key: OutboxKey, seq: int, ts: str) -> None:
+        """送信済みとして ts を記録"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET ts = ?, sent_at = ? WHERE sheet = ? AND doc_id = ? AND stage = ? AND date = ? AND seq = ?",
+                (ts, time.time(), *key, seq),
+            )
+
+    def pending_keys(self, stage: str, max_age_hours: float = SLACK_OUTBOX_RESUME_HOURS) -> List[OutboxKey]:
+        """未送信の投稿が残っているキー（作成から max_age_hours 以内のもの、古い順）"""
+        since = time.time() - max_age_hours * 3600 if max_age_hours else 0
+        with self._lock:
+            return [
+                (sheet, doc_id, stage_, date)
+                for sheet, doc_id, stage_, date in self.conn.execute(
+                    "SELECT sheet, doc_id, stage, date FROM outbox WHERE stage = ? AND ts IS NULL AND created_at >= ? "
+                    "GROUP BY sheet, doc_id, stage, date ORDER BY MIN(created_at)",
+                    (stage, since),
+                )
+            ]
+
+    def prune(self, retention_days: float = SLACK_OUTBOX_RETENTION_DAYS) -> None:
+        """保持期間を過ぎたキーを削除（送信済み・未送信とも）"""
+        if not retention_days:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE created_at < ?", (time.time() - retention_days * 86400,))
+
+
+_OUTBOX: Optional[SlackOutbox] = None
+_OUTBOX_LOCK = threading.Lock()
+
+
+def get_outbox() -> Optional[SlackOutbox]:
+    """SLACK_OUTBOX_PATH が設定されていれば outbox を返す（空なら None）"""
+    global _OUTBOX
+    if not SLACK_OUTBOX_PATH:
+        return None
+    with _OUTBOX_LOCK:
+        if _OUTBOX is None:
+            _OUTBOX = SlackOutbox(SLACK_OUTBOX_PATH)
+    return _OUTBOX
+
+
+def outbox_key(sheet: str, row: Mapping[str, Any], stage: str, date: str) -> OutboxKey:
+    """
+    行の投稿を識別するキー。行は doc_url の Docs ファイルIDで識別する
+    （doc_url が無い行のみ、やむを得ず行番号を使う）
+    """
+    doc_id = doc_id_from_url(row.get("doc_url", "")) or f"row:{row.get('_row_number') or 0}"
+    return (sheet, doc_id, stage, date or "")
+
+
+def outbox_row(key: OutboxKey, rows: Iterable[Mapping[str, Any]]) -> Optional[Mapping[str, Any]]:
+    """outbox_key の逆引き: key のシートの行（doc_url を含む）から key の行を探す"""
+    sheet, _, stage, date = key
+    for row in rows:
+        if outbox_key(sheet, row, stage, date) == key:
+            return row
+    return None
+
+
 class SlackClient:
     def __init__(self, token: str | None = None) -> None:
-        tok = (token or SLACK_BOT_TOKEN).strip()
-        if not tok:
-            self.client = None
+        self._token = (token or SLACK_BOT_TOKEN).strip()
+        self._client = None
+        self._users: Optional[SlackUserDirectory] = None
+        self._channels: Optional[SlackChannelScanner] = None
+        if not self._token:
             print("[slack] SLACK_BOT_TOKEN not set; Slack actions will be skipped.")
-        else:
-            self.client = WebClient(token=tok)
+
+    @property
+    def client(self):
+        """WebClient（トークン未設定なら None）。最初に使うときに生成する"""
+        if self._client is None and self._token:
+            _load_slack_sdk()
+            self._client = WebClient(token=self._token)
+        return self._client
+
+    def call(self, method: str, **kwargs) -> Any:
+        """
+        Slack API を呼ぶ（method は "chat.postMessage" 形式）
+        メソッドごとのトークンバケットで間隔を空け、レート制限されたら Retry-After + ゆらぎ だけ待って再試行する
+        それ以外の SlackApiError と、再試行を使い切った場合の SlackApiError はそのまま送出する
+        """
+        func = getattr(self.client, method.replace(".", "_"))
+        bucket = _bucket(method, kwargs.get("channel") or "")
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            _count(method, "calls")
+            if waited:
+                _count(method, "delayed")
+                _count(method, "wait_seconds", waited)
+            try:
+                return func(**kwargs)
+            except SlackApiError as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    raise
+                _count(method, "throttled")
+                bucket.drain()
+                if attempt >= SLACK_RATE_LIMIT_RETRIES:
+                    print(f"[slack] {method} rate limited; giving up after {attempt} retries")
+                    raise
+                attempt += 1
+                delay = retry_after + random.uniform(0, SLACK_RETRY_JITTER_SECONDS * attempt)
+                print(f"[slack] {method} rate limited; retrying in {delay:.1f}s ({attempt}/{SLACK_RATE_LIMIT_RETRIES})")
+                _count(method, "retried")
+                _count(method, "wait_seconds", delay)
+                time.sleep(delay)
+
+    @property
+    def users(self) -> SlackUserDirectory:
+        """メンション解決に使うユーザー対応表（最初に使うときに読み込む）"""
+        if self._users is None:
+            self._users = SlackUserDirectory(self)
+        return self._users
+
+    @property
+    def channels(self) -> SlackChannelScanner:
+        """スレッドの変化の検出に使うチャンネル履歴（チャンネルごとに最初に使うときに読む）"""
+        if self._channels is None:
+            self._channels = SlackChannelScanner(self)
+        return self._channels
+
+    def mention_text(self, emails: Iterable[str]) -> str:
+        """参加者メールから "<@U1> <@U2>" 形式のメンション文字列を作る"""
+        return " ".join(self.users.mentions(emails))
 
     def lookup_user_id_by_email(self, email: str) -> Optional[str]:
         if not self.client:
             return None
         try:
-            res = self.client.users_lookupByEmail(email=email)
+            res = self.call("users.lookupByEmail", email=email)
             return res["user"]["id"]
         except SlackApiError as e:
             print(f"[slack] lookupByEmail failed for {email}: {e}")
@@ -35,32 +695,35 @@ class SlackClient:
             return False
         try:
             # conversations_join は既に参加済みでも成功する
-            self.client.conversations_join(channel=channel)
+            self.call("conversations.join", channel=channel)
             print(f"[slack] joined channel {channel}")
             return True
         except SlackApiError as e:
             print(f"[slack] conversations_join error for {channel}: {e}")
             return False
 
-    def post_message(self, channel: str, text: str, thread_ts: Optional[str] = None, blocks: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+    def post_message(self, channel: str, text: str, thread_ts: Optional[str] = None, blocks: Optional[List[Dict[str, Any]]] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
         if not self.client:
             print("[slack] post_message skipped (no token).")
             return None
+        # メタデータ（outbox の識別子など）は指定したときだけ送る
+        extra = {"metadata": metadata} if metadata else {}
         try:
             # 日本語エイリアスの絵文字短縮系をUnicodeに正規化
             safe_text = normalize_slack_shortcodes(text)
-            res = self.client.chat_postMessage(channel=channel, text=safe_text, thread_ts=thread_ts, blocks=blocks)
+            res = self.call("chat.postMessage", channel=channel, text=safe_text, thread_ts=thread_ts, blocks=blocks, **extra)
             ts = res["ts"]
             print(f"[slack] posted message ts={ts} channel={channel} thread_ts={thread_ts or '-'}")
             return ts
         except SlackApiError as e:
-            err = getattr(e, 'response', {}).get('data', {}).get('error') if hasattr(e, 'response') else None
+            err = _api_error(e)
             print(f"[slack] post_message error (first attempt): {e}")
             # チャンネル未参加時は参加して再試行
             if err == "not_in_channel":
                 if self._try_join_channel(channel):
                     try:
-                        res = self.client.chat_postMessage(channel=channel, text=safe_text, thread_ts=thread_ts, blocks=blocks)
+                        res = self.call("chat.postMessage", channel=channel, text=safe_text, thread_ts=thread_ts, blocks=blocks, **extra)
                         ts = res["ts"]
                         print(f"[slack] posted message after join ts={ts} channel={channel}")
                         return ts
@@ -69,22 +732,185 @@ class SlackClient:
                         return None
             return None
 
+    def send_once(self, key: OutboxKey, channel: str, messages: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        key ごとに1回だけ投稿する（outbox 経由）
+        messages: {"text", "thread_ts"?（既存スレッドへの返信）, "reply_to"?（同じ messages 内の親の添字）}
+        戻り値: messages と同じ並びの投稿 ts（未送信は None）
+        同じ key の送信を既に試みていれば、新しい内容は使わず、前回の残りだけを送って記録済みの ts を返す
+        outbox が無効（SLACK_OUTBOX_PATH が空）なら順に直接投稿する
+        トークン未設定なら outbox に登録せず、何も送らない
+        """
+        if not self.client:
+            print("[slack] send_once skipped (no token).")
+            return [None] * len(messages)
+        outbox = get_outbox()
+        if outbox is None:
+            sent: List[Optional[str]] = []
+            for m in messages:
+                reply_to = m.get("reply_to")
+                thread_ts = sent[reply_to] if reply_to is not None else m.get("thread_ts")
+                if reply_to is not None and not thread_ts:
+                    sent.append(None)
+                    continue
+                sent.append(self.post_message(channel, m["text"], thread_ts=thread_ts))
+            return sent
+        if not outbox.enqueue(key, channel, messages):
+            print(f"[slack] outbox {key} already attempted; resuming")
+        return self._drain(outbox, key)
+
+    def resume_outbox(self, stage: str) -> List[Tuple[OutboxKey, List[Optional[str]]]]:
+        """
+        前回の実行で送り切れなかった stage の投稿を送る
+        戻り値: 再開したキーと投稿 ts（登録した messages の並び。未送信は None）の組
+        呼び出し側は、シートにまだ記録されていない ts を行に書き戻す
+        """
+        outbox = get_outbox()
+        if outbox is None or not self.client:
+            return []
+        resumed = []
+        for key in outbox.pending_keys(stage):
+            print(f"[slack] Resuming outbox {key}")
+            resumed.append((key, self._drain(outbox, key)))
+        return resumed
+
+    def outbox_started(self, key: OutboxKey) -> bool:
+        """key の投稿が既に outbox に登録されているか（投稿前の処理を繰り返さないために使う）"""
+        outbox = get_outbox()
+        return outbox is not None and bool(outbox.messages(key))
+
+    def outbox_thread_ts(self, key: OutboxKey) -> Optional[str]:
+        """key の最初の投稿を登録したときの投稿先スレッド（未登録・スレッド外なら None）"""
+        outbox = get_outbox()
+        messages = outbox.messages(key) if outbox is not None else []
+        return messages[0]["thread_ts"] if messages else None
+
+    def _drain(self, outbox: SlackOutbox, key: OutboxKey) -> List[Optional[str]]:
+        """key の未送信の投稿を seq 順に送る。失敗したらそこで止め、残りは次回に回す（順序を守る）"""
+        if not self.client:
+            return [m["ts"] for m in outbox.messages(key)]
+        sent: List[Optional[str]] = []
+        blocked = False
+        for m in outbox.messages(key):
+            if m["ts"]:
+                sent.append(m["ts"])
+                continue
+            reply_to = m["reply_to"]
+            thread_ts = sent[reply_to] if reply_to is not None and reply_to < len(sent) else m["thread_ts"]
+            if blocked or (reply_to is not None and not thread_ts):
+                sent.append(None)
+                blocked = True
+                continue
+            outbox_id = f"{key[0]}:{key[1]}:{key[2]}:{key[3]}:{m['seq']}"
+            ts = None
+            if m["sending_at"]:
+                # 前回、送信中に止まった: 実際には投稿済みかを Slack 側で確かめる
+                ts = self._find_outbox_post(m["channel"], thread_ts, outbox_id, m["sending_at"])
+                if ts:
+                    print(f"[slack] outbox {outbox_id} was already posted (ts={ts})")
+            if not ts:
+                outbox.mark_sending(key, m["seq"])
+                ts = self.post_message(
+                    m["channel"], m["text"], thread_ts=thread_ts,
+                    metadata={"event_type": OUTBOX_EVENT_TYPE, "event_payload": {"outbox_id": outbox_id}},
+                )
+            if ts:
+                outbox.ack(key, m["seq"], ts)
+            else:
+                blocked = True
+            sent.append(ts)
+        return sent
+
+    def _find_outbox_post(self, channel: str, thread_ts: Optional[str], outbox_id: str, since: float) -> Optional[str]:
+        """メタデータの outbox_id が一致する、since 以降の投稿の ts"""
+        params: Dict[str, Any] = {"channel": channel, "oldest": f"{since - 60:.6f}", "include_all_metadata": True, "limit": 200}
+        try:
+            if thread_ts:
+                res = self.call("conversations.replies", ts=thread_ts, **params)
+            else:
+                res = self.call("conversations.history", **params)
+        except SlackApiError as e:
+            print(f"[slack] Could not check outbox post {outbox_id}: {e}")
+            return None
+        for message in res.get("messages", []):
+            metadata = message.get("metadata") or {}
+            if metadata.get("event_type") == OUTBOX_EVENT_TYPE and (metadata.get("event_payload") or {}).get("outbox_id") == outbox_id:
+                return message.get("ts")
+        return None
+
     def fetch_thread_replies(self, channel: str, thread_ts: str) -> List[Dict[str, Any]]:
+        """
+        スレッドの全メッセージ（親を含む、ts 昇順）
+        キャッシュがあれば、前回見た最後のメッセージより新しいものだけを取得して追記する
+        """
         if not self.client:
             print("[slack] fetch_thread_replies skipped (no token).")
             return []
+        cache = get_thread_cache()
+        cached, latest_ts, stale = cache.get(channel, thread_ts) if cache is not None else ([], "", True)
+        # チャンネル履歴の親メッセージから、前回以降に返信があったかを判定する
+        parent = self.channels.parent(channel, thread_ts)
+        if parent is not None:
+            if not parent.get("reply_count"):
+                return [parent]
+            if cached and not stale and _ts_key(parent.get("latest_reply", "")) <= _ts_key(latest_ts):
+                print(f"[slack] thread {thread_ts} unchanged ({len(cached)} messages cached)")
+                return cached
+        full = stale or not latest_ts
         try:
-            replies = []
-            cursor = None
-            while True:
-                res = self.client.conversations_replies(channel=channel, ts=thread_ts, cursor=cursor, limit=200)
-                replies.extend(res.get("messages", []))
-                cursor = res.get("response_metadata", {}).get("next_cursor")
-                if not cursor:
-                    break
-            print(f"[slack] fetched {len(replies)} messages in thread {thread_ts}")
-            return replies
+            fetched = self._fetch_replies(channel, thread_ts, oldest=None if full else latest_ts)
         except SlackApiError as e:
             print(f"[slack] conversations_replies error: {e}")
-            return []
+            # 取得できなければ保存済みの分だけ返す
+            return cached
+        if cache is None:
+            print(f"[slack] fetched {len(fetched)} messages in thread {thread_ts}")
+            return fetched
+        cache.put(channel, thread_ts, fetched, replace=full)
+        if full:
+            print(f"[slack] fetched {len(fetched)} messages in thread {thread_ts}")
+            return fetched
+        merged = {m.get("ts"): m for m in cached}
+        new_count = sum(1 for m in fetched if m.get("ts") not in merged)
+        merged.update((m.get("ts"), m) for m in fetched)
+        messages = sorted(merged.values(), key=lambda m: _ts_key(m.get("ts", "")))
+        print(f"[slack] fetched {new_count} new of {len(messages)} messages in thread {thread_ts}")
+        return messages
 
+    def _fetch_replies(self, channel: str, thread_ts: str, oldest: Optional[str] = None) -> List[Dict[str, Any]]:
+        """conversations.replies を最後のページまで読む（oldest 指定時はそれより新しいもの＋親）"""
+        replies = []
+        cursor = None
+        params: Dict[str, Any] = {"channel": channel, "ts": thread_ts, "limit": 200}
+        if oldest:
+            params.update(oldest=oldest, inclusive=False)
+        while True:
+            res = self.call("conversations.replies", cursor=cursor, **params)
+            replies.extend(res.get("messages", []))
+            cursor = res.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        return replies
+
+    def count_thread_replies(self, channel: str, thread_ts: str) -> Optional[int]:
+        """
+        スレッドの返信数（親は含まない）。親メッセージの reply_count を1ページ目（1件）だけ読んで返す
+        取得できなければ None
+        """
+        if not self.client:
+            print("[slack] count_thread_replies skipped (no token).")
+            return None
+        # 既に読んだチャンネル履歴にあれば API を呼ばない
+        parent = self.channels.parent(channel, thread_ts, scan=False)
+        if parent is not None:
+            return int(parent.get("reply_count", 0) or 0)
+        try:
+            res = self.call("conversations.replies", channel=channel, ts=thread_ts, limit=1)
+        except SlackApiError as e:
+            print(f"[slack] conversations_replies error: {e}")
+            return None
+        messages = res.get("messages", [])
+        if not messages:
+            return 0
+        parent = messages[0]
+        return int(parent.get("reply_count", 0) or 0)
@@ -1,4 +1,4 @@
-import os, sys, requests
+import os, sys
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
@@ -12,33 +12,13 @@ def get(name, required=False, default=None):
         raise SystemExit(f"Missing env: {name}")
     return v
 
-def get_access_token():
-    r = requests.post("https://oauth2.googleapis.com/token", data={
-        "client_id": get("GOOGLE_CLIENT_ID", True),
-        "client_secret": get("GOOGLE_CLIENT_SECRET", True),
-        "refresh_token": get("GOOGLE_REFRESH_TOKEN", True),
-        "grant_type": "refresh_token",
-    }, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+def get_credentials():
+    # src.auth のトークンキャッシュを共有（有効なトークンがあればリフレッシュしない）
+    from src.auth import get_google_credentials
+    return get_google_credentials()
 
-def build_client(api, version, token):
+def build_client(api, version, creds):
     from googleapiclient.discovery import build
-    from google.oauth2.credentials import Credentials
-    scopes = [
-        "https://www.googleapis.com/auth/drive",
-        "https://www.googleapis.com/auth/documents",
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/calendar.readonly",
-    ]
-    creds = Credentials(
-        token=token,
-        refresh_token=get("GOOGLE_REFRESH_TOKEN"),
-        client_id=get("GOOGLE_CLIENT_ID"),
-        client_secret=get("GOOGLE_CLIENT_SECRET"),
-        token_uri="https://oauth2.googleapis.com/token",
-        scopes=scopes,
-    )
     return build(api, version, credentials=creds, cache_discovery=False)
 
 def show_env():
@@ -57,8 +37,8 @@ def show_env():
             print(f"{k}={v}")
 
 def show_drive():
-    token = get_access_token()
-    svc = build_client("drive","v3",token)
+    creds = get_credentials()
+    svc = build_client("drive","v3",creds)
     folder = get("DRIVE_FOLDER_ID", required=True)
     meeting_key = get("MEETING_KEY", default="")
     q = f"'{folder}' in parents and mimeType='application/vnd.google-apps.document' and trashed=false"
@@ -75,23 +55,29 @@ def show_drive():
         print(f"- {f['name']}  ({f['id']})  updated: {f['modifiedTime']}  owner: {f['owners'][0]['emailAddress']}")
 
 def show_docs(doc_id):
-    token = get_access_token()
-    svc = build_client("docs","v1",token)
-    d = svc.documents().get(documentId=doc_id).execute()
-    title = d.get("title","(no title)")
-    lines = []
-    for c in d.get("body",{}).get("content",[]):
-        p = c.get("paragraph")
-        if not p: continue
-        seg = "".join(e.get("textRun",{}).get("content","") for e in p.get("elements",[]) if e.get("textRun"))
-        if seg.strip(): lines.append(seg.strip())
-    text = "\n".join(lines)
-    print(f"# {title}\n")
-    print(text[:2000])
+    from src.doc_cache import cached_text
+    creds = get_credentials()
+    # 更新されていなければ Docs API を呼ばずにキャッシュから表示
+    modified = build_client("drive","v3",creds).files().get(
+        fileId=doc_id, fields="modifiedTime", supportsAllDrives=True,
+    ).execute().get("modifiedTime", "")
+    def fetch():
+        svc = build_client("docs","v1",creds)
+        d = svc.documents().get(documentId=doc_id).execute()
+        title = d.get("title","(no title)")
+        lines = []
+        for c in d.get("body",{}).get("content",[]):
+            p = c.get("paragraph")
+            if not p: continue
+            seg = "".join(e.get("textRun",{}).get("content","") for e in p.get("elements",[]) if e.get("textRun"))
+            if seg.strip(): lines.append(seg.strip())
+        text = "\n".join(lines)
+        return f"# {title}\n\n{text}"
+    print(cached_text(doc_id, modified, fetch, variant="view")[:2000])
 
 def show_sheets(range_a1=None):
-    token = get_access_token()
-    svc = build_client("sheets","v4",token)
+    creds = get_credentials()
+    svc = build_client("sheets","v4",creds)
     sid = get("PRIMARY_SHEET_ID", required=True)
     rng = range_a1 or "A1:Z20"
     vals = svc.spreadsheets().values().get(spreadsheetId=sid, range=rng).execute().get("values", [])
@@ -103,8 +89,8 @@ def show_sheets(range_a1=None):
         print(" | ".join(str(c).ljust(w) for c,w in zip(cells,widths)))
 
 def show_calendar():
-    token = get_access_token()
-    svc = build_client("calendar","v3",token)
+    creds = get_credentials()
+    svc = build_client("calendar","v3",creds)
     cal_id = get("CALENDAR_ID", default="primary")
     JST = timezone(timedelta(hours=9))
     start = datetime.now(JST).replace(hour=0,minute=0,second=0,microsecond=0)